@@ -0,0 +1,104 @@
+import asyncio
+import time
+from typing import Dict, Optional, Tuple
+from pyrogram import Client
+from pyrogram.enums import ChatMembersFilter, ChatMemberStatus
+from pyrogram.types import ChatMember, ChatMemberUpdated
+from config import Config
+import logging
+
+logger = logging.getLogger(__name__)
+
+ADMIN_STATUSES = (ChatMemberStatus.OWNER, ChatMemberStatus.ADMINISTRATOR)
+
+class AdminRoster:
+    """Per-chat administrator lists fetched in bulk and kept for a TTL"""
+
+    def __init__(self, ttl: int = None):
+        self.ttl = ttl or Config.ADMIN_CACHE_TTL
+        self.rosters: Dict[int, Tuple[float, Dict[int, ChatMember]]] = {}  # chat_id -> (fetched at, user_id -> member)
+        self.fetching: Dict[int, asyncio.Task] = {}
+        self.failed: Dict[int, float] = {}  # chat_id -> when bulk listing failed there
+        self.pruned_at = time.monotonic()
+        self.hits = 0
+        self.fetches = 0
+
+    async def get(self, client: Client, chat_id: int) -> Dict[int, ChatMember]:
+        """Administrators of a chat by user ID, fetched when missing or stale"""
+        now = time.monotonic()
+        if now - self.pruned_at >= self.ttl:
+            self.prune(now)
+
+        entry = self.rosters.get(chat_id)
+        if entry and now - entry[0] < self.ttl:
+            self.hits += 1
+            return entry[1]
+
+        # Commands arriving together share one fetch
+        task = self.fetching.get(chat_id)
+        if not task:
+            task = asyncio.create_task(self.fetch(client, chat_id))
+            self.fetching[chat_id] = task
+            task.add_done_callback(lambda _: self.fetching.pop(chat_id, None))
+        return await asyncio.shield(task)
+
+    async def fetch(self, client: Client, chat_id: int) -> Dict[int, ChatMember]:
+        admins = {}
+        async for member in client.get_chat_members(chat_id, filter=ChatMembersFilter.ADMINISTRATORS):
+            if member.user:
+                admins[member.user.id] = member
+        self.rosters[chat_id] = (time.monotonic(), admins)
+        self.fetches += 1
+        return admins
+
+    async def get_member(self, client: Client, chat_id: int, user_id: int) -> Optional[ChatMember]:
+        """Admin entry of a user, None for users who are not admins"""
+        failed_at = self.failed.get(chat_id)
+        if failed_at is None or time.monotonic() - failed_at >= self.ttl:
+            try:
+                return (await self.get(client, chat_id)).get(user_id)
+            except Exception as e:
+                # Listing administrators can be refused where a single lookup still works
+                logger.error(f"Error fetching admins of {chat_id}, using single lookups for {self.ttl}s: {e}")
+                self.failed[chat_id] = time.monotonic()
+
+        member = await client.get_chat_member(chat_id, user_id)
+        return member if member.status in ADMIN_STATUSES else None
+
+    def prune(self, now: float):
+        """Drop rosters and recorded failures past their TTL"""
+        self.pruned_at = now
+        for chat_id in [chat_id for chat_id, (fetched_at, _) in self.rosters.items() if now - fetched_at >= self.ttl]:
+            del self.rosters[chat_id]
+        for chat_id in [chat_id for chat_id, failed_at in self.failed.items() if now - failed_at >= self.ttl]:
+            del self.failed[chat_id]
+
+    def invalidate(self, chat_id: int):
+        self.rosters.pop(chat_id, None)
+        self.failed.pop(chat_id, None)
+
+    def on_member_updated(self, update: ChatMemberUpdated):
+        """Apply a promotion, demotion or departure to a cached roster"""
+        entry = self.rosters.get(update.chat.id)
+        if not entry:
+            return
+
+        member = update.new_chat_member or update.old_chat_member
+        if not member or not member.user:
+            # Nothing to patch the roster with, fetch it again next time
+            self.invalidate(update.chat.id)
+            return
+
+        admins = entry[1]
+        if update.new_chat_member and update.new_chat_member.status in ADMIN_STATUSES:
+            admins[member.user.id] = update.new_chat_member
+        else:
+            admins.pop(member.user.id, None)
+
+    def get_stats(self) -> dict:
+        return {
+            "chats": len(self.rosters),
+            "failed": len(self.failed),
+            "hits": self.hits,
+            "fetches": self.fetches
+        }
@@ -0,0 +1,129 @@
+import asyncio
+from typing import Dict, List, Optional
+from pyrogram import Client
+from pytgcalls import PyTgCalls
+from config import Config
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Assistant:
+    """One account carrying voice chats through its own PyTgCalls"""
+    __slots__ = ("name", "client", "calls", "chats", "healthy", "owned", "moved")
+
+    def __init__(self, name: str, client: Client, owned: bool = True):
+        self.name = name
+        self.client = client
+        self.calls = PyTgCalls(client)
+        self.chats = set()
+        self.healthy = True
+        self.owned = owned  # False for the main bot client, which is stopped elsewhere
+        self.moved = set()  # chats moved off while offline, whose calls it may still be in
+
+class AssistantPool:
+    """Places voice chats on assistant sessions and keeps each chat on one of them"""
+
+    PROBE_TIMEOUT = 10  # seconds an assistant gets to answer get_me
+
+    def __init__(self):
+        self.assistants: List[Assistant] = []
+        self.placements: Dict[int, Assistant] = {}
+
+    @staticmethod
+    def get_sessions() -> List[str]:
+        """ASSISTANT_SESSION plus any extra ASSISTANT_SESSIONS, without duplicates"""
+        sessions = []
+        for session in [Config.ASSISTANT_SESSION] + Config.ASSISTANT_SESSIONS:
+            if session and session not in sessions:
+                sessions.append(session)
+        return sessions
+
+    @staticmethod
+    def create_client(index: int, session: str) -> Client:
+        # Long values are exported session strings, short ones session file names
+        if len(session) > 64:
+            return Client(
+                f"assistant_{index}",
+                api_id=Config.ASSISTANT_API_ID,
+                api_hash=Config.ASSISTANT_API_HASH,
+                session_string=session,
+                in_memory=True
+            )
+        return Client(session, api_id=Config.ASSISTANT_API_ID, api_hash=Config.ASSISTANT_API_HASH)
+
+    async def start(self, fallback_client: Client) -> List[Assistant]:
+        """Start every configured assistant, falling back to the main client when none starts"""
+        for index, session in enumerate(self.get_sessions()):
+            try:
+                client = self.create_client(index, session)
+                await client.start()
+                assistant = Assistant(f"assistant_{index}", client)
+                await assistant.calls.start()
+                self.assistants.append(assistant)
+                logger.info(f"Assistant {assistant.name} started")
+            except Exception as e:
+                logger.error(f"Failed to start assistant {index}: {e}")
+
+        if not self.assistants:
+            assistant = Assistant("main", fallback_client, owned=False)
+            await assistant.calls.start()
+            self.assistants.append(assistant)
+
+        return self.assistants
+
+    async def stop(self):
+        for assistant in self.assistants:
+            if assistant.owned:
+                try:
+                    await assistant.client.stop()
+                except Exception as e:
+                    logger.error(f"Failed to stop {assistant.name}: {e}")
+
+    async def probe(self, assistant: Assistant) -> bool:
+        """Check that an assistant really answers, is_connected stays set on a dead session"""
+        try:
+            await asyncio.wait_for(assistant.client.get_me(), self.PROBE_TIMEOUT)
+            return True
+        except Exception as e:
+            logger.warning(f"{assistant.name} did not answer: {e}")
+            return False
+
+    def place(self, chat_id: int) -> Optional[Assistant]:
+        """Get the assistant of a chat, assigning the least loaded healthy one to new chats"""
+        assistant = self.placements.get(chat_id)
+        if assistant and assistant.healthy:
+            return assistant
+
+        candidates = [
+            candidate for candidate in self.assistants
+            if candidate.healthy and (not Config.ASSISTANT_MAX_CHATS or len(candidate.chats) < Config.ASSISTANT_MAX_CHATS)
+        ]
+        if not candidates:
+            return None
+
+        self.release(chat_id)
+        assistant = min(candidates, key=lambda candidate: len(candidate.chats))
+        assistant.chats.add(chat_id)
+        self.placements[chat_id] = assistant
+        return assistant
+
+    def get(self, chat_id: int) -> Optional[Assistant]:
+        return self.placements.get(chat_id)
+
+    def release(self, chat_id: int):
+        assistant = self.placements.pop(chat_id, None)
+        if assistant:
+            assistant.chats.discard(chat_id)
+
+    def get_client(self) -> Optional[Client]:
+        """First started assistant account, shared with broadcasting"""
+        for assistant in self.assistants:
+            if assistant.owned:
+                return assistant.client
+        return None
+
+    def get_stats(self) -> List[dict]:
+        return [
+            {"name": assistant.name, "chats": len(assistant.chats), "healthy": assistant.healthy}
+            for assistant in self.assistants
+        ]
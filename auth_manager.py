@@ -1,7 +1,10 @@
-from pyrogram.types import Message
+import time
+from collections import OrderedDict
+from pyrogram.types import Message, ChatMemberUpdated
 from pyrogram.enums import ChatMemberStatus
 from config import Config
 from database import Database
+from admin_roster import AdminRoster
 import logging
 
 logger = logging.getLogger(__name__)
@@ -9,9 +12,26 @@ logger = logging.getLogger(__name__)
 class AuthManager:
     def __init__(self, db: Database):
         self.db = db
+        self.admins = AdminRoster()
+        # (chat_id, user_id) -> (expires at, decision) for group chats
+        self.decisions: OrderedDict = OrderedDict()
+        self.checks = 0
+        self.decision_hits = 0
+        self.total_check_time = 0.0
+        self.max_check_time = 0.0
     
     async def is_authorized(self, message: Message) -> bool:
         """Check if user is authorized to use music commands"""
+        started = time.perf_counter()
+        try:
+            return await self.check_authorized(message)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.checks += 1
+            self.total_check_time += elapsed
+            self.max_check_time = max(self.max_check_time, elapsed)
+    
+    async def check_authorized(self, message: Message) -> bool:
         user_id = message.from_user.id
         chat_id = message.chat.id
         
@@ -20,11 +40,11 @@ class AuthManager:
             return True
         
         # Check if user is globally banned
-        if await self.db.is_user_banned(user_id):
+        if self.db.is_user_banned(user_id):
             return False
         
         # Check if chat is blacklisted
-        if await self.db.is_chat_blacklisted(chat_id):
+        if self.db.is_chat_blacklisted(chat_id):
             return False
         
         # Private chats - allow if not banned
@@ -33,19 +53,61 @@ class AuthManager:
         
         # Group chats - check authorization
         if message.chat.type.name in ["GROUP", "SUPERGROUP"]:
-            # Check if user is authorized in this chat
-            if await self.db.is_user_authorized(chat_id, user_id):
-                return True
-            
+            # Bans and blacklists are checked above on every call, so cached decisions never outlive them
+            cached = self.decisions.get((chat_id, user_id))
+            if cached and cached[0] > time.monotonic():
+                self.decision_hits += 1
+                return cached[1]
+            return await self.check_group(message, chat_id, user_id)
+        
+        return False
+    
+    async def check_group(self, message: Message, chat_id: int, user_id: int) -> bool:
+        # Check if user is authorized in this chat
+        if await self.db.is_user_authorized(chat_id, user_id):
+            decision = True
+        else:
             # Check if user is admin
             try:
-                member = await message._client.get_chat_member(chat_id, user_id)
-                if member.status in [ChatMemberStatus.OWNER, ChatMemberStatus.ADMINISTRATOR]:
-                    return True
+                decision = await self.admins.get_member(message._client, chat_id, user_id) is not None
             except Exception as e:
                 logger.error(f"Error checking admin status: {e}")
+                return False  # not cached, the next command asks again
         
-        return False
+        self.remember(chat_id, user_id, decision)
+        return decision
+    
+    def remember(self, chat_id: int, user_id: int, decision: bool):
+        if not Config.AUTH_CACHE_TTL:
+            return
+        key = (chat_id, user_id)
+        self.decisions[key] = (time.monotonic() + Config.AUTH_CACHE_TTL, decision)
+        self.decisions.move_to_end(key)
+        while len(self.decisions) > Config.AUTH_CACHE_SIZE:
+            self.decisions.popitem(last=False)
+    
+    def forget(self, chat_id: int, user_id: int):
+        """Drop the cached decision for a user in a chat"""
+        self.decisions.pop((chat_id, user_id), None)
+    
+    def on_member_updated(self, update: ChatMemberUpdated):
+        """Apply an admin change to the roster and the decisions made from it"""
+        self.admins.on_member_updated(update)
+        member = update.new_chat_member or update.old_chat_member
+        if member and member.user:
+            self.forget(update.chat.id, member.user.id)
+        else:
+            for key in [key for key in self.decisions if key[0] == update.chat.id]:
+                del self.decisions[key]
+    
+    def get_stats(self) -> dict:
+        return {
+            "checks": self.checks,
+            "cached": len(self.decisions),
+            "hit_rate": round(self.decision_hits / self.checks * 100, 1) if self.checks else 0,
+            "avg_ms": round(self.total_check_time / self.checks * 1000, 2) if self.checks else 0,
+            "max_ms": round(self.max_check_time * 1000, 2)
+        }
     
     async def is_admin(self, message: Message) -> bool:
         """Check if user is admin in the chat"""
@@ -62,8 +124,7 @@ class AuthManager:
         
         # Group chats
         try:
-            member = await message._client.get_chat_member(chat_id, user_id)
-            return member.status in [ChatMemberStatus.OWNER, ChatMemberStatus.ADMINISTRATOR]
+            return await self.admins.get_member(message._client, chat_id, user_id) is not None
         except Exception as e:
             logger.error(f"Error checking admin status: {e}")
             return False
@@ -83,8 +144,8 @@ class AuthManager:
         
         # Group chats
         try:
-            member = await message._client.get_chat_member(chat_id, user_id)
-            return member.status == ChatMemberStatus.OWNER
+            member = await self.admins.get_member(message._client, chat_id, user_id)
+            return member is not None and member.status == ChatMemberStatus.OWNER
         except Exception as e:
             logger.error(f"Error checking owner status: {e}")
             return False
@@ -104,10 +165,10 @@ class AuthManager:
         
         # Group chats - check admin permissions
         try:
-            member = await message._client.get_chat_member(chat_id, user_id)
-            if member.status in [ChatMemberStatus.OWNER, ChatMemberStatus.ADMINISTRATOR]:
+            member = await self.admins.get_member(message._client, chat_id, user_id)
+            if member:
                 # Check specific permissions
-                if hasattr(member, 'privileges') and member.privileges:
+                if member.status == ChatMemberStatus.ADMINISTRATOR and member.privileges:
                     return member.privileges.can_manage_video_chats
                 return True  # Assume admin can manage if privileges not available
         except Exception as e:
@@ -130,8 +191,9 @@ class AuthManager:
     async def authorize_user_in_chat(self, chat_id: int, user_id: int, authorized_by: int) -> bool:
         """Authorize user in a specific chat"""
         try:
-            await self.db.authorize_user(chat_id, user_id, authorized_by)
-            return True
+            authorized = await self.db.authorize_user(chat_id, user_id, authorized_by, wait=True)
+            self.forget(chat_id, user_id)
+            return authorized
         except Exception as e:
             logger.error(f"Error authorizing user {user_id} in chat {chat_id}: {e}")
             return False
@@ -139,8 +201,9 @@ class AuthManager:
     async def unauthorize_user_in_chat(self, chat_id: int, user_id: int) -> bool:
         """Remove user authorization in a specific chat"""
         try:
-            await self.db.unauthorize_user(chat_id, user_id)
-            return True
+            unauthorized = await self.db.unauthorize_user(chat_id, user_id)
+            self.forget(chat_id, user_id)
+            return unauthorized
         except Exception as e:
             logger.error(f"Error unauthorizing user {user_id} in chat {chat_id}: {e}")
             return False
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""Measure group authorization latency of the original per-command path and of AuthManager.
+
+Usage:
+    python benchmarks/auth_bench.py [--checks 500] [--users 50] [--api-ms 20]
+
+Group members are checked against a real database in a temporary directory.
+A fake client answers admin lookups after --api-ms, standing in for Telegram.
+
+original: ban, blacklist and authorized_users queries plus get_chat_member on every command
+no cache: AuthManager with the decision cache and admin roster TTLs at 0
+cached:   AuthManager as configured for production
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OWNER_ID", "0")
+
+from pyrogram.enums import ChatMemberStatus
+from pyrogram.types import Message
+from config import Config
+from database import Database
+from auth_manager import AuthManager
+
+CHAT_ID = -100
+
+class FakeClient:
+    """Answers admin lookups after a fixed delay"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.calls = 0
+
+    async def get_chat_members(self, chat_id, filter=None):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        yield SimpleNamespace(user=SimpleNamespace(id=1), status=ChatMemberStatus.OWNER, privileges=None)
+
+    async def get_chat_member(self, chat_id, user_id):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        status = ChatMemberStatus.OWNER if user_id == 1 else ChatMemberStatus.MEMBER
+        return SimpleNamespace(user=SimpleNamespace(id=user_id), status=status, privileges=None)
+
+def make_message(client: FakeClient, user_id: int):
+    return SimpleNamespace(
+        from_user=SimpleNamespace(id=user_id),
+        chat=SimpleNamespace(id=CHAT_ID, type=SimpleNamespace(name="SUPERGROUP")),
+        _client=client
+    )
+
+async def original_is_authorized(db: Database, message: Message) -> bool:
+    """AuthManager.is_authorized as it was before moderation lists, rosters and decisions were cached"""
+    user_id = message.from_user.id
+    chat_id = message.chat.id
+    async with db.connection.execute("SELECT 1 FROM banned_users WHERE user_id = ?", (user_id,)) as cursor:
+        if await cursor.fetchone():
+            return False
+    async with db.connection.execute("SELECT 1 FROM blacklisted_chats WHERE chat_id = ?", (chat_id,)) as cursor:
+        if await cursor.fetchone():
+            return False
+    async with db.connection.execute(
+        "SELECT 1 FROM authorized_users WHERE chat_id = ? AND user_id = ?", (chat_id, user_id)
+    ) as cursor:
+        if await cursor.fetchone():
+            return True
+    member = await message._client.get_chat_member(chat_id, user_id)
+    return member.status in (ChatMemberStatus.OWNER, ChatMemberStatus.ADMINISTRATOR)
+
+async def run_original(db: Database, checks: int, users: int, delay: float):
+    client = FakeClient(delay)
+    start = time.perf_counter()
+    for _ in range(checks):
+        await original_is_authorized(db, make_message(client, random.randint(1, users)))
+    return (time.perf_counter() - start) / checks, client.calls
+
+async def run(db: Database, checks: int, users: int, delay: float, cache_ttl: int):
+    Config.AUTH_CACHE_TTL = cache_ttl
+    auth = AuthManager(db)
+    # Without the decision cache, every admin check misses the roster too
+    auth.admins.ttl = 3600 if cache_ttl else 0
+    client = FakeClient(delay)
+
+    start = time.perf_counter()
+    for _ in range(checks):
+        await auth.is_authorized(make_message(client, random.randint(1, users)))
+    elapsed = time.perf_counter() - start
+    return elapsed / checks, auth.get_stats(), client.calls
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--checks", type=int, default=500)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--api-ms", type=float, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        db = Database(os.path.join(directory, "auth.db"))
+        await db.connect()
+        for user_id in range(2, args.users + 1, 2):
+            await db.authorize_user(CHAT_ID, user_id, 1)
+        await db.flush()
+
+        original, original_calls = await run_original(db, args.checks, args.users, args.api_ms / 1000)
+        uncached, _, uncached_calls = await run(db, args.checks, args.users, args.api_ms / 1000, 0)
+        cached, stats, cached_calls = await run(db, args.checks, args.users, args.api_ms / 1000, 60)
+        await db.disconnect()
+
+    print(f"checks:   {args.checks} over {args.users} users, {args.api_ms:.0f} ms per admin lookup")
+    print(f"original: {original * 1000:.3f} ms/check, {original_calls} API calls")
+    print(f"no cache: {uncached * 1000:.3f} ms/check, {uncached_calls} API calls")
+    print(f"cached:   {cached * 1000:.3f} ms/check, {cached_calls} API calls, {stats['hit_rate']}% hits")
+    print(f"speedup:  {original / cached:.1f}x over original, {uncached / cached:.1f}x over no cache")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Compare hot-path write throughput with a commit per write and with write-behind batching.
+
+Usage:
+    python benchmarks/db_write_bench.py [--writes 2000] [--concurrency 50]
+
+Both runs use a fresh database file in a temporary directory, so the numbers
+include the real fsync cost of the filesystem that directory lives on.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OWNER_ID", "0")
+
+from database import Database
+
+async def run_writers(writes: int, concurrency: int, write) -> float:
+    queue = asyncio.Queue()
+    for user_id in range(writes):
+        queue.put_nowait(user_id)
+
+    async def worker():
+        while not queue.empty():
+            await write(queue.get_nowait())
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return writes / (time.perf_counter() - start)
+
+async def run_committed(path: str, writes: int, concurrency: int) -> float:
+    db = Database(path)
+    await db.connect()
+
+    async def write(user_id: int):
+        await db.connection.execute(
+            "INSERT OR REPLACE INTO users (user_id, username, first_name) VALUES (?, ?, ?)",
+            (user_id, None, "bench")
+        )
+        await db.connection.commit()
+
+    rate = await run_writers(writes, concurrency, write)
+    await db.disconnect()
+    return rate
+
+async def run_batched(path: str, writes: int, concurrency: int) -> float:
+    db = Database(path)
+    await db.connect()
+
+    async def write(user_id: int):
+        await db.add_user(user_id, None, "bench", wait=True)
+
+    rate = await run_writers(writes, concurrency, write)
+    await db.disconnect()
+    return rate
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writes", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        committed = await run_committed(os.path.join(directory, "committed.db"), args.writes, args.concurrency)
+        batched = await run_batched(os.path.join(directory, "batched.db"), args.writes, args.concurrency)
+
+    print(f"writes:    {args.writes} from {args.concurrency} concurrent writers")
+    print(f"committed: {committed:.0f} writes/s")
+    print(f"batched:   {batched:.0f} writes/s (durable, wait=True)")
+    print(f"speedup:   {batched / committed:.1f}x")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Compare per-call YoutubeDL overhead with and without the instance pool.
+
+Usage:
+    python benchmarks/ydl_pool_bench.py [--calls 50] [--url <video url>]
+
+Without --url only instance setup/teardown is measured, which needs no
+network access. With --url every call also runs a full info extraction.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OWNER_ID", "0")
+
+import yt_dlp
+from extractor_backend import YoutubeDLPool
+
+OPTS = {
+    'quiet': True,
+    'no_warnings': True,
+    'skip_download': True,
+}
+
+def run_fresh(calls: int, url: str = None) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        with yt_dlp.YoutubeDL(OPTS) as ydl:
+            if url:
+                ydl.extract_info(url, download=False)
+    return (time.perf_counter() - start) / calls
+
+def run_pooled(calls: int, url: str = None) -> float:
+    pool = YoutubeDLPool(max_idle=1)
+    start = time.perf_counter()
+    for _ in range(calls):
+        with pool.checkout("info", OPTS) as ydl:
+            if url:
+                ydl.extract_info(url, download=False)
+    elapsed = (time.perf_counter() - start) / calls
+    pool.close()
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument("--url", default=None)
+    args = parser.parse_args()
+
+    fresh = run_fresh(args.calls, args.url)
+    pooled = run_pooled(args.calls, args.url)
+
+    print(f"calls:   {args.calls}{' (with extraction)' if args.url else ''}")
+    print(f"fresh:   {fresh * 1000:.2f} ms/call")
+    print(f"pooled:  {pooled * 1000:.2f} ms/call")
+    print(f"speedup: {fresh / pooled:.1f}x")
+
+if __name__ == "__main__":
+    main()
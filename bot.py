@@ -1,11 +1,16 @@
 import os
+import time
 import asyncio
+import inspect
+import functools
 import logging
 from pyrogram import Client, filters
+from pyrogram.handlers import MessageHandler, CallbackQueryHandler
 from pyrogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton
 from config import Config
 from database import Database
 from music_player import MusicPlayer
+from queue_journal import QueueJournal
 from youtube_downloader import YouTubeDownloader
 from auth_manager import AuthManager
 from broadcast_manager import BroadcastManager
@@ -31,15 +36,18 @@ class MusicBot:
             plugins=dict(root="plugins")
         )
         self.db = Database()
-        self.music_player = MusicPlayer()
         self.youtube_dl = YouTubeDownloader()
+        self.music_player = MusicPlayer(self.youtube_dl, QueueJournal(self.db))
         self.auth_manager = AuthManager(self.db)
         self.broadcast_manager = BroadcastManager(self.app, self.db)
         self.maintenance_mode = False
         self.logging_enabled = True
+        self.handled = 0
+        self.handling_time = 0.0
 
     async def start_bot(self):
         await self.app.start()
+        self.time_handlers()
         await self.db.connect()
         logger.info("🎵 Music Bot Started Successfully!")
         
@@ -74,6 +82,33 @@ class MusicBot:
             ]
         ])
 
+    def time_handlers(self):
+        """Measure how long message and callback handlers take, plugins included"""
+        for handlers in self.app.dispatcher.groups.values():
+            for handler in handlers:
+                if isinstance(handler, (MessageHandler, CallbackQueryHandler)) and inspect.iscoroutinefunction(handler.callback):
+                    handler.callback = self.timed(handler.callback)
+
+    def timed(self, callback):
+        @functools.wraps(callback)
+        async def wrapper(client, update):
+            started = time.perf_counter()
+            try:
+                return await callback(client, update)
+            finally:
+                self.handled += 1
+                self.handling_time += time.perf_counter() - started
+        return wrapper
+
+    def get_handling_stats(self) -> dict:
+        """Update handling time and the share of it spent in authorization checks"""
+        auth_time = self.auth_manager.total_check_time
+        return {
+            "handled": self.handled,
+            "avg_ms": round(self.handling_time / self.handled * 1000, 2) if self.handled else 0,
+            "auth_share": round(auth_time / self.handling_time * 100, 1) if self.handling_time else 0
+        }
+
     @staticmethod
     def is_sudoer(user_id):
         return user_id in Config.SUDOERS
@@ -152,6 +187,9 @@ async def help_command(client, message: Message):
 • `/vplayforce` - Force video play
 • `/queue` - Show current queue
 • `/shuffle` - Shuffle queue
+• `/remove <pos>` - Remove song from queue
+• `/move <from> <to>` - Move song in queue
+• `/skipto <pos>` - Jump to song in queue
 
 **⚡ Control Commands:**
 • `/pause` - Pause playback
@@ -216,6 +254,14 @@ async def stats_command(client, message: Message):
     # Bot stats
     total_users = await bot.db.get_users_count()
     total_chats = await bot.db.get_chats_count()
+    lock_stats = bot.music_player.get_lock_stats()
+    admin_stats = bot.auth_manager.admins.get_stats()
+    auth_stats = bot.auth_manager.get_stats()
+    handling_stats = bot.get_handling_stats()
+    assistants_text = ", ".join(
+        f"{a['name']}: {a['chats']}{'' if a['healthy'] else ' (offline)'}"
+        for a in bot.music_player.assistants.get_stats()
+    )
     
     stats_text = f"""
 📊 **Bot Statistics**
@@ -234,12 +280,22 @@ async def stats_command(client, message: Message):
 
 **🎵 Music Stats:**
 • **Active VCs:** {len(bot.music_player.active_chats)}
+• **Assistants:** {assistants_text}
 • **Queue Songs:** {bot.music_player.get_total_queue_count()}
+• **Pending Player Ops:** {lock_stats['pending']} (avg wait {lock_stats['avg_wait_ms']}ms, max {lock_stats['max_wait_ms']}ms)
 • **Downloads Today:** {await bot.db.get_downloads_today()}
+• **Admin Cache:** {admin_stats['chats']} chats, {admin_stats['hits']} hits, {admin_stats['fetches']} fetches
+• **Auth Checks:** {auth_stats['checks']} (avg {auth_stats['avg_ms']}ms, max {auth_stats['max_ms']}ms, {auth_stats['hit_rate']}% cached)
+• **Handlers:** {handling_stats['handled']} updates (avg {handling_stats['avg_ms']}ms, {handling_stats['auth_share']}% in auth checks)
     """
     
     await message.reply_text(stats_text)
 
+@bot.app.on_chat_member_updated()
+async def chat_member_updated(client, update):
+    # Keeps cached admin lists and auth decisions in step with promotions and demotions
+    bot.auth_manager.on_member_updated(update)
+
 # Callback query handlers
 @bot.app.on_callback_query()
 async def callback_handler(client, callback_query):
@@ -256,6 +312,7 @@ async def callback_handler(client, callback_query):
 • `/vplay <name>` - Play video
 • `/queue` - Show queue
 • `/shuffle` - Shuffle queue
+• `/remove`, `/move`, `/skipto` - Edit queue
 
 **⚡ Control:**
 • `/pause` - Pause music
@@ -14,8 +14,13 @@ class BroadcastManager:
         self.db = db
         self.assistant_client = None
         
-    async def initialize_assistant(self):
+    async def initialize_assistant(self, client: Client = None):
         """Initialize assistant client for broadcasting"""
+        if client:
+            # Reuse an assistant already started for voice chats, a session can't run twice
+            self.assistant_client = client
+            return
+        
         if Config.ASSISTANT_SESSION:
             try:
                 self.assistant_client = Client(
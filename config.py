@@ -15,15 +15,57 @@ class Config:
     ASSISTANT_API_ID = int(os.environ.get("ASSISTANT_API_ID", API_ID))
     ASSISTANT_API_HASH = os.environ.get("ASSISTANT_API_HASH", API_HASH)
     ASSISTANT_SESSION = os.environ.get("ASSISTANT_SESSION", "assistant_session")
+    ASSISTANT_SESSIONS = os.environ.get("ASSISTANT_SESSIONS", "").split()  # extra voice chat assistants
+    ASSISTANT_MAX_CHATS = int(os.environ.get("ASSISTANT_MAX_CHATS", "0"))  # per assistant, 0 = unlimited
+    ASSISTANT_FAILOVER_GRACE = int(os.environ.get("ASSISTANT_FAILOVER_GRACE", "15"))  # seconds offline before chats move
     
     # Database Configuration
     DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///music_bot.db")
+    DB_READERS = int(os.environ.get("DB_READERS", "4"))  # read-only connections next to the writer
+    DB_CACHE_SIZE_MB = int(os.environ.get("DB_CACHE_SIZE_MB", "16"))  # page cache per connection
+    DB_MMAP_SIZE_MB = int(os.environ.get("DB_MMAP_SIZE_MB", "64"))
+    DB_BATCH_INTERVAL = int(os.environ.get("DB_BATCH_INTERVAL", "50"))  # ms a write waits for others to share its commit
+    DB_BATCH_SIZE = int(os.environ.get("DB_BATCH_SIZE", "200"))  # statements that commit a batch at once
+    
+    # Auth Configuration
+    ADMIN_CACHE_TTL = int(os.environ.get("ADMIN_CACHE_TTL", "300"))  # seconds a chat's admin list is trusted
+    AUTH_CACHE_TTL = int(os.environ.get("AUTH_CACHE_TTL", "60"))  # seconds a group auth decision is reused, 0 = off
+    AUTH_CACHE_SIZE = int(os.environ.get("AUTH_CACHE_SIZE", "10000"))
     
     # Music Configuration
     DOWNLOAD_DIR = os.environ.get("DOWNLOAD_DIR", "downloads")
     MAX_DURATION = int(os.environ.get("MAX_DURATION", "3600"))  # 1 hour
     QUEUE_LIMIT = int(os.environ.get("QUEUE_LIMIT", "50"))
     
+    # Media Cache
+    MEDIA_CACHE_DIR = os.environ.get("MEDIA_CACHE_DIR", os.path.join(DOWNLOAD_DIR, "cache"))
+    MEDIA_CACHE_MAX_BYTES = int(os.environ.get("MEDIA_CACHE_SIZE_MB", "2048")) * 1024 * 1024
+    
+    # Search Cache
+    SEARCH_CACHE_TTL = int(os.environ.get("SEARCH_CACHE_TTL", "900"))  # seconds
+    SEARCH_CACHE_SIZE = int(os.environ.get("SEARCH_CACHE_SIZE", "1000"))
+    
+    # Stream URL Cache
+    STREAM_URL_EXPIRY_MARGIN = int(os.environ.get("STREAM_URL_EXPIRY_MARGIN", "600"))  # seconds
+    STREAM_URL_DEFAULT_TTL = int(os.environ.get("STREAM_URL_DEFAULT_TTL", "1800"))  # seconds
+    STREAM_URL_CACHE_SIZE = int(os.environ.get("STREAM_URL_CACHE_SIZE", "2000"))
+    
+    # Prefetch of the next queued track
+    PREFETCH_MODE = os.environ.get("PREFETCH_MODE", "url")  # off, url or download
+    PREFETCH_MAX_CONCURRENT = int(os.environ.get("PREFETCH_MAX_CONCURRENT", "3"))
+    PREFETCH_MAX_DURATION = int(os.environ.get("PREFETCH_MAX_DURATION", "900"))  # seconds, download mode only
+    
+    # Queue Journal (restores queues after a restart)
+    QUEUE_RESTORE = os.environ.get("QUEUE_RESTORE", "True").lower() == "true"
+    JOURNAL_FLUSH_INTERVAL = float(os.environ.get("JOURNAL_FLUSH_INTERVAL", "1.0"))  # seconds
+    JOURNAL_COMPACT_INTERVAL = int(os.environ.get("JOURNAL_COMPACT_INTERVAL", "300"))  # seconds
+    RESTORE_CONCURRENCY = int(os.environ.get("RESTORE_CONCURRENCY", "25"))
+    
+    # Shared decode for chats starting the same audio track
+    FANOUT_ENABLED = os.environ.get("FANOUT_ENABLED", "False").lower() == "true"
+    FANOUT_BUFFER_SECONDS = int(os.environ.get("FANOUT_BUFFER_SECONDS", "30"))
+    FANOUT_DIR = os.environ.get("FANOUT_DIR", os.path.join(DOWNLOAD_DIR, "fanout"))
+    
     # Spotify Configuration (Optional)
     SPOTIFY_CLIENT_ID = os.environ.get("SPOTIFY_CLIENT_ID")
     SPOTIFY_CLIENT_SECRET = os.environ.get("SPOTIFY_CLIENT_SECRET")
@@ -39,6 +81,8 @@ class Config:
     # Feature Toggles
     PRIVATE_BOT_MODE = bool(os.environ.get("PRIVATE_BOT_MODE", False))
     AUTO_LEAVE_TIME = int(os.environ.get("AUTO_LEAVE_TIME", "600"))  # 10 minutes
+    MAX_PAUSE_TIME = int(os.environ.get("MAX_PAUSE_TIME", "1800"))  # seconds, 0 = never stop paused chats
+    CACHE_RELEASE_INTERVAL = int(os.environ.get("CACHE_RELEASE_INTERVAL", "3600"))  # seconds between cache trims
     
     # Render.com specific
     PORT = int(os.environ.get("PORT", "8000"))
@@ -46,6 +90,14 @@ class Config:
     # Limits
     MAX_CONCURRENT_DOWNLOADS = int(os.environ.get("MAX_CONCURRENT_DOWNLOADS", "5"))
     MAX_PLAYLIST_SIZE = int(os.environ.get("MAX_PLAYLIST_SIZE", "100"))
+    PLAYLIST_CONCURRENCY = int(os.environ.get("PLAYLIST_CONCURRENCY", "3"))
+    PROGRESS_UPDATE_INTERVAL = float(os.environ.get("PROGRESS_UPDATE_INTERVAL", "5"))  # seconds
+    YDL_POOL_SIZE = int(os.environ.get("YDL_POOL_SIZE", "4"))  # idle YoutubeDL instances per profile
+    
+    # Extraction Backend
+    EXTRACTOR_BACKEND = os.environ.get("EXTRACTOR_BACKEND", "thread")  # thread or process
+    EXTRACTOR_WORKERS = int(os.environ.get("EXTRACTOR_WORKERS", "2"))
+    EXTRACTOR_TIMEOUT = int(os.environ.get("EXTRACTOR_TIMEOUT", "60"))  # seconds
     
     # Quality Settings
     AUDIO_QUALITY = os.environ.get("AUDIO_QUALITY", "320")  # kbps
@@ -55,5 +107,6 @@ class Config:
     def create_dirs():
         """Create necessary directories"""
         os.makedirs(Config.DOWNLOAD_DIR, exist_ok=True)
+        os.makedirs(Config.MEDIA_CACHE_DIR, exist_ok=True)
         os.makedirs("logs", exist_ok=True)
         os.makedirs("temp", exist_ok=True)
@@ -1,8 +1,10 @@
 import asyncio
 import sqlite3
 import aiosqlite
+from contextlib import asynccontextmanager
 from typing import List, Optional, Dict
 from datetime import datetime, timedelta
+from config import Config
 import logging
 
 logger = logging.getLogger(__name__)
@@ -10,16 +12,182 @@ logger = logging.getLogger(__name__)
 class Database:
     def __init__(self, db_path: str = "music_bot.db"):
         self.db_path = db_path
-        self.connection = None
+        self.connection = None  # the only connection that writes
+        self.readers: asyncio.Queue = asyncio.Queue()
+        self.reader_connections: List[aiosqlite.Connection] = []
+        # Moderation lists mirrored in memory, written through by the methods that change them
+        self.banned_users: set = set()
+        self.blacklisted_chats: set = set()
+        # Write-behind batch: (statements, future) groups committed together
+        self.pending: List[tuple] = []
+        self.pending_statements = 0
+        self.batch_ready = asyncio.Event()
+        self.batch_full = asyncio.Event()
+        self.write_lock = asyncio.Lock()
+        self.writer_task: Optional[asyncio.Task] = None
+        self.stopping = False
+        self.batches = 0
+        self.batched_statements = 0
     
     async def connect(self):
         """Connect to database and create tables"""
         self.connection = await aiosqlite.connect(self.db_path)
+        await self.configure(self.connection)
         await self.create_tables()
-        logger.info("Database connected successfully")
+        await self.load_moderation()
+        
+        # WAL lets readers run next to the writer, an in-memory database has nothing to share
+        if self.db_path != ":memory:":
+            for _ in range(Config.DB_READERS):
+                reader = await aiosqlite.connect(f"file:{self.db_path}?mode=ro", uri=True)
+                await self.configure(reader)
+                self.reader_connections.append(reader)
+                self.readers.put_nowait(reader)
+        self.stopping = False
+        self.writer_task = asyncio.create_task(self.run_writer())
+        logger.info(f"Database connected successfully ({len(self.reader_connections)} readers)")
+    
+    async def load_moderation(self):
+        """Load banned user and blacklisted chat IDs into memory"""
+        async with self.connection.execute("SELECT user_id FROM banned_users") as cursor:
+            self.banned_users = {row[0] for row in await cursor.fetchall()}
+        async with self.connection.execute("SELECT chat_id FROM blacklisted_chats") as cursor:
+            self.blacklisted_chats = {row[0] for row in await cursor.fetchall()}
+    
+    async def configure(self, connection: aiosqlite.Connection):
+        """Apply WAL mode and performance pragmas to a connection"""
+        await connection.execute("PRAGMA journal_mode=WAL")
+        await connection.execute("PRAGMA synchronous=NORMAL")
+        await connection.execute(f"PRAGMA cache_size=-{Config.DB_CACHE_SIZE_MB * 1024}")
+        await connection.execute(f"PRAGMA mmap_size={Config.DB_MMAP_SIZE_MB * 1024 * 1024}")
+        await connection.execute("PRAGMA temp_store=MEMORY")
+        await connection.execute("PRAGMA busy_timeout=5000")
+    
+    @asynccontextmanager
+    async def read(self, sql: str, parameters=()):
+        """Run a query on a pooled read-only connection, or on the writer when there is no pool"""
+        if not self.reader_connections:
+            async with self.connection.execute(sql, parameters) as cursor:
+                yield cursor
+            return
+        
+        reader = await self.readers.get()
+        try:
+            async with reader.execute(sql, parameters) as cursor:
+                yield cursor
+        finally:
+            self.readers.put_nowait(reader)
+    
+    async def write(self, statements: List[tuple], wait: bool = False) -> bool:
+        """Queue (sql, parameters) statements for the next batched commit, wait=True returns once committed"""
+        future = asyncio.get_running_loop().create_future() if wait else None
+        self.pending.append((statements, future))
+        self.pending_statements += len(statements)
+        self.batch_ready.set()
+        # A waiting caller gets the next commit right away, writes queued meanwhile share the one after
+        if future or self.pending_statements >= Config.DB_BATCH_SIZE:
+            self.batch_full.set()
+        
+        if not future:
+            return True
+        if not self.writer_task:
+            await self.flush()  # connecting or shutting down, nobody else would commit it
+        return await future
+    
+    async def run_writer(self):
+        while True:
+            await self.batch_ready.wait()
+            # Let more writes join the transaction unless the batch is already full
+            try:
+                await asyncio.wait_for(self.batch_full.wait(), Config.DB_BATCH_INTERVAL / 1000)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing write batch: {e}")
+            if self.stopping:
+                return
+    
+    async def flush(self):
+        """Commit every queued write in one transaction"""
+        async with self.write_lock:
+            batch, self.pending = self.pending, []
+            self.pending_statements = 0
+            self.batch_ready.clear()
+            self.batch_full.clear()
+            if not batch:
+                return
+            
+            # Runs of the same statement go through one executemany, in queue order
+            runs = []
+            for index, (statements, _) in enumerate(batch):
+                for sql, parameters in statements:
+                    if runs and runs[-1][0] == sql:
+                        runs[-1][1].append(parameters)
+                    else:
+                        runs.append((sql, [parameters]))
+            
+            results = [True] * len(batch)
+            try:
+                for sql, parameters in runs:
+                    await self.connection.executemany(sql, parameters)
+                await self.connection.commit()
+            except Exception as e:
+                logger.error(f"Error in write batch, retrying its writes one by one: {e}")
+                await self.connection.rollback()
+                results = await self.apply_each(batch)
+            
+            self.batches += 1
+            self.batched_statements += sum(len(statements) for statements, _ in batch)
+            for (_, future), result in zip(batch, results):
+                if future and not future.done():
+                    future.set_result(result)
+    
+    async def apply_each(self, batch: List[tuple]) -> List[bool]:
+        """Apply a batch in one transaction with a savepoint per write, so a bad write only undoes itself"""
+        results = []
+        try:
+            await self.connection.execute("BEGIN")
+            for statements, _ in batch:
+                await self.connection.execute("SAVEPOINT batched_write")
+                try:
+                    for sql, parameters in statements:
+                        await self.connection.execute(sql, parameters)
+                    results.append(True)
+                except Exception as e:
+                    logger.error(f"Error in batched write: {e}")
+                    await self.connection.execute("ROLLBACK TO batched_write")
+                    results.append(False)
+                await self.connection.execute("RELEASE batched_write")
+            await self.connection.commit()
+            return results
+        except Exception as e:
+            logger.error(f"Error committing write batch: {e}")
+            await self.connection.rollback()
+            return [False] * len(batch)
+    
+    def get_write_stats(self) -> dict:
+        return {
+            "pending": self.pending_statements,
+            "batches": self.batches,
+            "statements": self.batched_statements
+        }
     
     async def disconnect(self):
         """Disconnect from database"""
+        if self.writer_task:
+            # Cancelling could land mid-flush and drop the batch, so let the writer finish it and stop
+            self.stopping = True
+            self.batch_ready.set()
+            self.batch_full.set()
+            await self.writer_task
+            self.writer_task = None
+        if self.connection:
+            await self.flush()
+        for reader in self.reader_connections:
+            await reader.close()
+        self.reader_connections.clear()
         if self.connection:
             await self.connection.close()
     
@@ -84,6 +252,18 @@ class Database:
                 last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             );
             
+            CREATE TABLE IF NOT EXISTS file_ids (
+                video_id TEXT,
+                format_type TEXT,
+                file_id TEXT,
+                title TEXT,
+                duration TEXT,
+                uploader TEXT,
+                file_size INTEGER,
+                created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (video_id, format_type)
+            );
+            
             CREATE TABLE IF NOT EXISTS playlists (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 user_id INTEGER,
@@ -91,25 +271,35 @@ class Database:
                 songs TEXT,
                 created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             );
+            
+            CREATE TABLE IF NOT EXISTS queue_journal (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                chat_id INTEGER,
+                op TEXT,
+                data TEXT,
+                created REAL
+            );
+            
+            CREATE TABLE IF NOT EXISTS queue_snapshots (
+                chat_id INTEGER PRIMARY KEY,
+                state TEXT,
+                seq INTEGER
+            );
         """)
         await self.connection.commit()
     
     # User Management
-    async def add_user(self, user_id: int, username: str = None, first_name: str = None):
+    async def add_user(self, user_id: int, username: str = None, first_name: str = None, wait: bool = False):
         """Add or update user"""
-        try:
-            await self.connection.execute("""
-                INSERT OR REPLACE INTO users (user_id, username, first_name)
-                VALUES (?, ?, ?)
-            """, (user_id, username, first_name))
-            await self.connection.commit()
-        except Exception as e:
-            logger.error(f"Error adding user {user_id}: {e}")
+        return await self.write([("""
+            INSERT OR REPLACE INTO users (user_id, username, first_name)
+            VALUES (?, ?, ?)
+        """, (user_id, username, first_name))], wait)
     
     async def get_user(self, user_id: int) -> Optional[Dict]:
         """Get user information"""
         try:
-            async with self.connection.execute("""
+            async with self.read("""
                 SELECT * FROM users WHERE user_id = ?
             """, (user_id,)) as cursor:
                 row = await cursor.fetchone()
@@ -124,7 +314,7 @@ class Database:
     async def get_users_count(self) -> int:
         """Get total users count"""
         try:
-            async with self.connection.execute("SELECT COUNT(*) FROM users") as cursor:
+            async with self.read("SELECT COUNT(*) FROM users") as cursor:
                 result = await cursor.fetchone()
                 return result[0] if result else 0
         except Exception as e:
@@ -133,45 +323,37 @@ class Database:
     
     async def ban_user(self, user_id: int, banned_by: int, reason: str = None):
         """Ban a user globally"""
-        try:
-            await self.connection.execute("""
+        banned = await self.write([
+            ("""
                 INSERT OR REPLACE INTO banned_users (user_id, banned_by, reason)
                 VALUES (?, ?, ?)
-            """, (user_id, banned_by, reason))
-            
-            await self.connection.execute("""
+            """, (user_id, banned_by, reason)),
+            ("""
                 UPDATE users SET is_banned = 1 WHERE user_id = ?
             """, (user_id,))
-            
-            await self.connection.commit()
-        except Exception as e:
-            logger.error(f"Error banning user {user_id}: {e}")
+        ], wait=True)
+        if banned:
+            self.banned_users.add(user_id)
+        return banned
     
     async def unban_user(self, user_id: int):
         """Unban a user"""
-        try:
-            await self.connection.execute("DELETE FROM banned_users WHERE user_id = ?", (user_id,))
-            await self.connection.execute("UPDATE users SET is_banned = 0 WHERE user_id = ?", (user_id,))
-            await self.connection.commit()
-        except Exception as e:
-            logger.error(f"Error unbanning user {user_id}: {e}")
+        unbanned = await self.write([
+            ("DELETE FROM banned_users WHERE user_id = ?", (user_id,)),
+            ("UPDATE users SET is_banned = 0 WHERE user_id = ?", (user_id,))
+        ], wait=True)
+        if unbanned:
+            self.banned_users.discard(user_id)
+        return unbanned
     
-    async def is_user_banned(self, user_id: int) -> bool:
+    def is_user_banned(self, user_id: int) -> bool:
         """Check if user is banned"""
-        try:
-            async with self.connection.execute("""
-                SELECT 1 FROM banned_users WHERE user_id = ?
-            """, (user_id,)) as cursor:
-                result = await cursor.fetchone()
-                return result is not None
-        except Exception as e:
-            logger.error(f"Error checking ban status for {user_id}: {e}")
-            return False
+        return user_id in self.banned_users
     
     async def get_banned_users(self) -> List[Dict]:
         """Get all banned users"""
         try:
-            async with self.connection.execute("""
+            async with self.read("""
                 SELECT bu.*, u.username, u.first_name
                 FROM banned_users bu
                 LEFT JOIN users u ON bu.user_id = u.user_id
@@ -187,19 +369,15 @@ class Database:
     # Chat Management
     async def add_chat(self, chat_id: int, chat_title: str = None, chat_type: str = None):
         """Add or update chat"""
-        try:
-            await self.connection.execute("""
-                INSERT OR REPLACE INTO chats (chat_id, chat_title, chat_type)
-                VALUES (?, ?, ?)
-            """, (chat_id, chat_title, chat_type))
-            await self.connection.commit()
-        except Exception as e:
-            logger.error(f"Error adding chat {chat_id}: {e}")
+        return await self.write([("""
+            INSERT OR REPLACE INTO chats (chat_id, chat_title, chat_type)
+            VALUES (?, ?, ?)
+        """, (chat_id, chat_title, chat_type))], wait=True)
     
     async def get_chats_count(self) -> int:
         """Get total chats count"""
         try:
-            async with self.connection.execute("SELECT COUNT(*) FROM chats WHERE is_active = 1") as cursor:
+            async with self.read("SELECT COUNT(*) FROM chats WHERE is_active = 1") as cursor:
                 result = await cursor.fetchone()
                 return result[0] if result else 0
         except Exception as e:
@@ -208,67 +386,52 @@ class Database:
     
     async def blacklist_chat(self, chat_id: int, blacklisted_by: int, reason: str = None):
         """Blacklist a chat"""
-        try:
-            await self.connection.execute("""
+        blacklisted = await self.write([
+            ("""
                 INSERT OR REPLACE INTO blacklisted_chats (chat_id, blacklisted_by, reason)
                 VALUES (?, ?, ?)
-            """, (chat_id, blacklisted_by, reason))
-            
-            await self.connection.execute("""
+            """, (chat_id, blacklisted_by, reason)),
+            ("""
                 UPDATE chats SET is_blacklisted = 1 WHERE chat_id = ?
             """, (chat_id,))
-            
-            await self.connection.commit()
-        except Exception as e:
-            logger.error(f"Error blacklisting chat {chat_id}: {e}")
+        ], wait=True)
+        if blacklisted:
+            self.blacklisted_chats.add(chat_id)
+        return blacklisted
     
     async def whitelist_chat(self, chat_id: int):
         """Remove chat from blacklist"""
-        try:
-            await self.connection.execute("DELETE FROM blacklisted_chats WHERE chat_id = ?", (chat_id,))
-            await self.connection.execute("UPDATE chats SET is_blacklisted = 0 WHERE chat_id = ?", (chat_id,))
-            await self.connection.commit()
-        except Exception as e:
-            logger.error(f"Error whitelisting chat {chat_id}: {e}")
+        whitelisted = await self.write([
+            ("DELETE FROM blacklisted_chats WHERE chat_id = ?", (chat_id,)),
+            ("UPDATE chats SET is_blacklisted = 0 WHERE chat_id = ?", (chat_id,))
+        ], wait=True)
+        if whitelisted:
+            self.blacklisted_chats.discard(chat_id)
+        return whitelisted
     
-    async def is_chat_blacklisted(self, chat_id: int) -> bool:
+    def is_chat_blacklisted(self, chat_id: int) -> bool:
         """Check if chat is blacklisted"""
-        try:
-            async with self.connection.execute("""
-                SELECT 1 FROM blacklisted_chats WHERE chat_id = ?
-            """, (chat_id,)) as cursor:
-                result = await cursor.fetchone()
-                return result is not None
-        except Exception as e:
-            logger.error(f"Error checking blacklist status for {chat_id}: {e}")
-            return False
+        return chat_id in self.blacklisted_chats
     
     # Authorization Management
-    async def authorize_user(self, chat_id: int, user_id: int, authorized_by: int):
+    async def authorize_user(self, chat_id: int, user_id: int, authorized_by: int, wait: bool = False):
         """Authorize user in a chat"""
-        try:
-            await self.connection.execute("""
-                INSERT OR REPLACE INTO authorized_users (chat_id, user_id, authorized_by)
-                VALUES (?, ?, ?)
-            """, (chat_id, user_id, authorized_by))
-            await self.connection.commit()
-        except Exception as e:
-            logger.error(f"Error authorizing user {user_id} in chat {chat_id}: {e}")
+        return await self.write([("""
+            INSERT OR REPLACE INTO authorized_users (chat_id, user_id, authorized_by)
+            VALUES (?, ?, ?)
+        """, (chat_id, user_id, authorized_by))], wait)
     
     async def unauthorize_user(self, chat_id: int, user_id: int):
         """Remove user authorization"""
-        try:
-            await self.connection.execute("""
-                DELETE FROM authorized_users WHERE chat_id = ? AND user_id = ?
-            """, (chat_id, user_id))
-            await self.connection.commit()
-        except Exception as e:
-            logger.error(f"Error removing authorization for user {user_id} in chat {chat_id}: {e}")
+        # Goes through the batch so it can't overtake a queued authorize_user
+        return await self.write([("""
+            DELETE FROM authorized_users WHERE chat_id = ? AND user_id = ?
+        """, (chat_id, user_id))], wait=True)
     
     async def is_user_authorized(self, chat_id: int, user_id: int) -> bool:
         """Check if user is authorized in chat"""
         try:
-            async with self.connection.execute("""
+            async with self.read("""
                 SELECT 1 FROM authorized_users WHERE chat_id = ? AND user_id = ?
             """, (chat_id, user_id)) as cursor:
                 result = await cursor.fetchone()
@@ -280,7 +443,7 @@ class Database:
     async def get_authorized_users(self, chat_id: int) -> List[Dict]:
         """Get authorized users for a chat"""
         try:
-            async with self.connection.execute("""
+            async with self.read("""
                 SELECT au.*, u.username, u.first_name
                 FROM authorized_users au
                 LEFT JOIN users u ON au.user_id = u.user_id
@@ -296,28 +459,24 @@ class Database:
     
     # Download Management
     async def add_download(self, user_id: int, chat_id: int, title: str, url: str, 
-                          file_path: str, format_type: str, file_size: int = 0):
+                          file_path: str, format_type: str, file_size: int = 0, wait: bool = False):
         """Record a download"""
-        try:
-            await self.connection.execute("""
+        return await self.write([
+            ("""
                 INSERT INTO downloads (user_id, chat_id, title, url, file_path, format_type, file_size)
                 VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (user_id, chat_id, title, url, file_path, format_type, file_size))
-            
+            """, (user_id, chat_id, title, url, file_path, format_type, file_size)),
             # Update user download count
-            await self.connection.execute("""
+            ("""
                 UPDATE users SET download_count = download_count + 1 WHERE user_id = ?
             """, (user_id,))
-            
-            await self.connection.commit()
-        except Exception as e:
-            logger.error(f"Error recording download: {e}")
+        ], wait)
     
     async def get_downloads_today(self) -> int:
         """Get downloads count for today"""
         try:
             today = datetime.now().date()
-            async with self.connection.execute("""
+            async with self.read("""
                 SELECT COUNT(*) FROM downloads 
                 WHERE DATE(download_date) = ?
             """, (today,)) as cursor:
@@ -330,7 +489,7 @@ class Database:
     async def get_user_downloads(self, user_id: int, limit: int = 10) -> List[Dict]:
         """Get user's recent downloads"""
         try:
-            async with self.connection.execute("""
+            async with self.read("""
                 SELECT * FROM downloads WHERE user_id = ?
                 ORDER BY download_date DESC LIMIT ?
             """, (user_id, limit)) as cursor:
@@ -341,22 +500,93 @@ class Database:
             logger.error(f"Error getting downloads for user {user_id}: {e}")
             return []
     
-    # Statistics
-    async def update_stat(self, stat_name: str, stat_value: int):
-        """Update bot statistics"""
+    # Telegram file_id Cache
+    async def save_file_id(self, video_id: str, format_type: str, file_id: str, title: str = None,
+                           duration: str = None, uploader: str = None, file_size: int = 0):
+        """Store Telegram file_id of an uploaded download"""
+        return await self.write([("""
+            INSERT OR REPLACE INTO file_ids (video_id, format_type, file_id, title, duration, uploader, file_size)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (video_id, format_type, file_id, title, duration, uploader, file_size))])
+    
+    async def get_file_id(self, video_id: str, format_type: str) -> Optional[Dict]:
+        """Get cached Telegram file_id with its metadata"""
         try:
-            await self.connection.execute("""
-                INSERT OR REPLACE INTO bot_stats (stat_name, stat_value, last_updated)
-                VALUES (?, ?, CURRENT_TIMESTAMP)
-            """, (stat_name, stat_value))
-            await self.connection.commit()
+            async with self.read("""
+                SELECT file_id, title, duration, uploader, file_size FROM file_ids
+                WHERE video_id = ? AND format_type = ?
+            """, (video_id, format_type)) as cursor:
+                row = await cursor.fetchone()
+                if row:
+                    columns = [description[0] for description in cursor.description]
+                    return dict(zip(columns, row))
+                return None
         except Exception as e:
-            logger.error(f"Error updating stat {stat_name}: {e}")
+            logger.error(f"Error getting file_id for {video_id}: {e}")
+            return None
+    
+    async def delete_file_id(self, video_id: str, format_type: str):
+        """Remove a stale Telegram file_id"""
+        return await self.write([("""
+            DELETE FROM file_ids WHERE video_id = ? AND format_type = ?
+        """, (video_id, format_type))], wait=True)
+    
+    # Queue Journal
+    async def append_journal(self, entries: List[tuple], heartbeat: float) -> bool:
+        """Append (chat_id, op, data, created) entries and the journal heartbeat in one commit"""
+        insert = """
+            INSERT INTO queue_journal (chat_id, op, data, created) VALUES (?, ?, ?, ?)
+        """
+        return await self.write([(insert, entry) for entry in entries] + [("""
+            INSERT OR REPLACE INTO bot_stats (stat_name, stat_value, last_updated)
+            VALUES ('journal_heartbeat', ?, CURRENT_TIMESTAMP)
+        """, (int(heartbeat),))], wait=True)
+    
+    async def load_journal(self):
+        """Get queue snapshots as {chat_id: (state, seq)} and journal rows in order"""
+        try:
+            async with self.read("""
+                SELECT chat_id, state, seq FROM queue_snapshots
+            """) as cursor:
+                snapshots = {row[0]: (row[1], row[2]) for row in await cursor.fetchall()}
+            async with self.read("""
+                SELECT seq, chat_id, op, data FROM queue_journal ORDER BY seq
+            """) as cursor:
+                rows = await cursor.fetchall()
+            return snapshots, rows
+        except Exception as e:
+            logger.error(f"Error loading queue journal: {e}")
+            return {}, []
+    
+    async def compact_journal(self, snapshots: List[tuple], upto_seq: int):
+        """Store (chat_id, state, seq) snapshots, None state drops a chat, and truncate the journal"""
+        store = """
+            INSERT OR REPLACE INTO queue_snapshots (chat_id, state, seq) VALUES (?, ?, ?)
+        """
+        drop = """
+            DELETE FROM queue_snapshots WHERE chat_id = ?
+        """
+        return await self.write(
+            [(store, snapshot) for snapshot in snapshots if snapshot[1] is not None]
+            + [(drop, (snapshot[0],)) for snapshot in snapshots if snapshot[1] is None]
+            + [("""
+                DELETE FROM queue_journal WHERE seq <= ?
+            """, (upto_seq,))],
+            wait=True
+        )
+    
+    # Statistics
+    async def update_stat(self, stat_name: str, stat_value: int, wait: bool = False):
+        """Update bot statistics"""
+        return await self.write([("""
+            INSERT OR REPLACE INTO bot_stats (stat_name, stat_value, last_updated)
+            VALUES (?, ?, CURRENT_TIMESTAMP)
+        """, (stat_name, stat_value))], wait)
     
     async def get_stat(self, stat_name: str) -> int:
         """Get bot statistic"""
         try:
-            async with self.connection.execute("""
+            async with self.read("""
                 SELECT stat_value FROM bot_stats WHERE stat_name = ?
             """, (stat_name,)) as cursor:
                 result = await cursor.fetchone()
@@ -368,20 +598,16 @@ class Database:
     # Playlist Management
     async def create_playlist(self, user_id: int, playlist_name: str, songs: List[str]):
         """Create user playlist"""
-        try:
-            songs_json = ",".join(songs)
-            await self.connection.execute("""
-                INSERT INTO playlists (user_id, playlist_name, songs)
-                VALUES (?, ?, ?)
-            """, (user_id, playlist_name, songs_json))
-            await self.connection.commit()
-        except Exception as e:
-            logger.error(f"Error creating playlist: {e}")
+        songs_json = ",".join(songs)
+        return await self.write([("""
+            INSERT INTO playlists (user_id, playlist_name, songs)
+            VALUES (?, ?, ?)
+        """, (user_id, playlist_name, songs_json))], wait=True)
     
     async def get_user_playlists(self, user_id: int) -> List[Dict]:
         """Get user playlists"""
         try:
-            async with self.connection.execute("""
+            async with self.read("""
                 SELECT * FROM playlists WHERE user_id = ?
                 ORDER BY created_date DESC
             """, (user_id,)) as cursor:
@@ -400,19 +626,15 @@ class Database:
     # Cleanup
     async def cleanup_old_downloads(self, days: int = 7):
         """Clean up old download records"""
-        try:
-            cutoff_date = datetime.now() - timedelta(days=days)
-            await self.connection.execute("""
-                DELETE FROM downloads WHERE download_date < ?
-            """, (cutoff_date,))
-            await self.connection.commit()
-        except Exception as e:
-            logger.error(f"Error cleaning up old downloads: {e}")
+        cutoff_date = datetime.now() - timedelta(days=days)
+        return await self.write([("""
+            DELETE FROM downloads WHERE download_date < ?
+        """, (cutoff_date,))], wait=True)
     
     async def get_all_chat_ids(self) -> List[int]:
         """Get all active chat IDs for broadcasting"""
         try:
-            async with self.connection.execute("""
+            async with self.read("""
                 SELECT chat_id FROM chats 
                 WHERE is_active = 1 AND is_blacklisted = 0
             """) as cursor:
@@ -425,7 +647,7 @@ class Database:
     async def get_all_user_ids(self) -> List[int]:
         """Get all user IDs for broadcasting"""
         try:
-            async with self.connection.execute("""
+            async with self.read("""
                 SELECT user_id FROM users WHERE is_banned = 0
             """) as cursor:
                 rows = await cursor.fetchall()
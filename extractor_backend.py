@@ -0,0 +1,255 @@
+import asyncio
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from typing import Dict, Hashable, List, Optional
+import yt_dlp
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+class PooledYoutubeDL:
+    """Long-lived YoutubeDL instance with a swappable progress hook"""
+
+    def __init__(self, opts: Dict):
+        self.progress_hook = None
+        opts = dict(opts)
+        opts['progress_hooks'] = [self._dispatch_progress]
+        self.ydl = yt_dlp.YoutubeDL(opts)
+
+    def _dispatch_progress(self, d):
+        if self.progress_hook:
+            self.progress_hook(d)
+
+    def close(self):
+        try:
+            self.ydl.__exit__(None, None, None)
+        except Exception as e:
+            logger.error(f"Error closing YoutubeDL instance: {e}")
+
+class YoutubeDLPool:
+    """Pool of reusable YoutubeDL instances, one set per option profile.
+
+    Building a YoutubeDL loads every extractor and sets up HTTP state, so
+    instances are kept around and handed to one executor thread at a time.
+    """
+
+    def __init__(self, max_idle: int = None):
+        self.max_idle = max_idle if max_idle is not None else Config.YDL_POOL_SIZE
+        self.idle: Dict[Hashable, List[PooledYoutubeDL]] = {}
+        self.lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+
+    @contextmanager
+    def checkout(self, profile: Hashable, opts: Dict, progress_hook=None):
+        """Borrow an instance for a profile, creating one if none is idle"""
+        with self.lock:
+            idle = self.idle.setdefault(profile, [])
+            pooled = idle.pop() if idle else None
+            if pooled:
+                self.reused += 1
+            else:
+                self.created += 1
+
+        if not pooled:
+            pooled = PooledYoutubeDL(opts)
+
+        pooled.progress_hook = progress_hook
+        try:
+            yield pooled.ydl
+        except BaseException:
+            # Don't hand a possibly broken instance to the next caller
+            pooled.close()
+            raise
+
+        pooled.progress_hook = None
+        with self.lock:
+            idle = self.idle.setdefault(profile, [])
+            if len(idle) < self.max_idle:
+                idle.append(pooled)
+                pooled = None
+        if pooled:
+            pooled.close()
+
+    def close(self):
+        """Close all idle instances"""
+        with self.lock:
+            idle, self.idle = self.idle, {}
+        for instances in idle.values():
+            for pooled in instances:
+                pooled.close()
+
+    def get_stats(self) -> dict:
+        """Get pool statistics"""
+        with self.lock:
+            return {
+                "profiles": len(self.idle),
+                "idle": sum(len(instances) for instances in self.idle.values()),
+                "created": self.created,
+                "reused": self.reused
+            }
+
+
+# Process-side state, created once per worker by _init_worker
+_worker_pool: Optional[YoutubeDLPool] = None
+
+def _init_worker():
+    """Pre-import yt_dlp and set up the worker's own instance pool"""
+    global _worker_pool
+    logging.getLogger("yt_dlp").setLevel(logging.ERROR)
+    _worker_pool = YoutubeDLPool()
+
+def _warm_worker(opts: Dict) -> bool:
+    """Build one instance so extractors are loaded before the first real call"""
+    with _worker_pool.checkout("info", opts):
+        return True
+
+def _run_extraction(profile: Hashable, opts: Dict, url: str) -> Optional[Dict]:
+    """Extract info in a worker process and return a picklable dict"""
+    try:
+        with _worker_pool.checkout(profile, opts) as ydl:
+            info = ydl.extract_info(url, download=False)
+            return yt_dlp.YoutubeDL.sanitize_info(info) if info else None
+    except Exception as e:
+        # yt-dlp errors may carry unpicklable state, send back the message only
+        raise RuntimeError(str(e)) from None
+
+class ExtractorBackend:
+    """Runs yt-dlp calls off the event loop.
+
+    In "thread" mode calls run on a dedicated thread pool rather than the
+    loop's default executor. In "process" mode metadata extraction runs in
+    warm worker processes so it doesn't compete for the GIL; downloads stay
+    on threads because their progress hooks must call back into this
+    process.
+    """
+
+    def __init__(self, mode: str = None, workers: int = None, timeout: float = None):
+        self.mode = (mode or Config.EXTRACTOR_BACKEND).lower()
+        self.workers = workers or Config.EXTRACTOR_WORKERS
+        self.timeout = timeout if timeout is not None else Config.EXTRACTOR_TIMEOUT
+        self.pool = YoutubeDLPool()
+        self.thread_executor = self.create_thread_executor()
+        self.process_executor = None
+        self.recycled = 0
+        
+        if self.mode == "process":
+            self.process_executor = self.create_process_executor()
+        elif self.mode != "thread":
+            logger.warning(f"Unknown extractor backend '{self.mode}', using threads")
+            self.mode = "thread"
+
+    def create_thread_executor(self) -> ThreadPoolExecutor:
+        return ThreadPoolExecutor(
+            max_workers=self.workers + Config.MAX_CONCURRENT_DOWNLOADS,
+            thread_name_prefix="yt-dlp"
+        )
+
+    def create_process_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker
+        )
+
+    async def start(self):
+        """Spawn and warm worker processes"""
+        if not self.process_executor:
+            return
+        
+        loop = asyncio.get_event_loop()
+        opts = {'quiet': True, 'no_warnings': True}
+        try:
+            await asyncio.gather(*[
+                loop.run_in_executor(self.process_executor, _warm_worker, opts)
+                for _ in range(self.workers)
+            ])
+            logger.info(f"Extractor backend started with {self.workers} worker processes")
+        except Exception as e:
+            logger.error(f"Failed to warm extractor workers: {e}")
+
+    async def extract(self, profile: Hashable, opts: Dict, url: str, download: bool = False,
+                      progress_hook=None, timeout: float = None) -> Optional[Dict]:
+        """Run extract_info for a profile with a timeout.
+
+        Cancelling the returned coroutine drops calls still waiting for a
+        worker; calls already running are abandoned and their result is
+        discarded. A timeout also replaces the executor it happened on, so
+        a hung extraction can't keep its worker.
+        """
+        loop = asyncio.get_event_loop()
+        timeout = timeout if timeout is not None else self.timeout
+        
+        # A timeout of 0 means wait as long as it takes (e.g. long downloads)
+        timeout = timeout or None
+        
+        if self.process_executor and not download and not progress_hook:
+            executor = self.process_executor
+            try:
+                future = loop.run_in_executor(executor, _run_extraction, profile, opts, url)
+                return await asyncio.wait_for(future, timeout=timeout)
+            except asyncio.TimeoutError:
+                self.recycle_processes(executor)
+                raise
+            except BrokenProcessPool as e:
+                # A pool recycled under this call is not broken, the call just runs on a thread this time
+                if executor is self.process_executor:
+                    logger.error(f"Extractor worker pool broke, falling back to threads: {e}")
+                    self.process_executor.shutdown(wait=False, cancel_futures=True)
+                    self.process_executor = None
+                    self.mode = "thread"
+        
+        def run():
+            with self.pool.checkout(profile, opts, progress_hook) as ydl:
+                return ydl.extract_info(url, download=download)
+        
+        executor = self.thread_executor
+        future = loop.run_in_executor(executor, run)
+        try:
+            return await asyncio.wait_for(future, timeout=timeout)
+        except asyncio.TimeoutError:
+            self.recycle_threads(executor)
+            raise
+
+    def recycle_processes(self, executor: ProcessPoolExecutor):
+        """Replace a process pool after a timeout, terminating the worker stuck in it"""
+        if executor is not self.process_executor:
+            return  # another timeout already replaced it
+        logger.warning("Extraction timed out, restarting extractor worker processes")
+        # The executor has no public handle on its workers, and shutdown() would wait for the stuck one
+        processes = list((executor._processes or {}).values())
+        executor.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            process.terminate()
+        self.process_executor = self.create_process_executor()
+        self.recycled += 1
+
+    def recycle_threads(self, executor: ThreadPoolExecutor):
+        """Give new calls a fresh thread pool after a timeout"""
+        if executor is not self.thread_executor:
+            return
+        # Threads can't be killed; the stuck one exits with its call, queued calls still run
+        logger.warning("Extraction timed out, moving new calls to a fresh thread pool")
+        self.thread_executor = self.create_thread_executor()
+        executor.shutdown(wait=False)
+        self.recycled += 1
+
+    def close(self):
+        """Shut down executors and release pooled instances"""
+        self.thread_executor.shutdown(wait=False, cancel_futures=True)
+        if self.process_executor:
+            self.process_executor.shutdown(wait=False, cancel_futures=True)
+        self.pool.close()
+
+    def get_stats(self) -> dict:
+        """Get backend statistics"""
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "recycled": self.recycled,
+            "pool": self.pool.get_stats()
+        }
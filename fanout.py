@@ -0,0 +1,243 @@
+import asyncio
+import errno
+import os
+import uuid
+from typing import Dict, Optional, Tuple
+from config import Config
+import logging
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 48000
+CHANNELS = 2
+BYTES_PER_SECOND = SAMPLE_RATE * CHANNELS * 2  # s16le
+CHUNK_SIZE = BYTES_PER_SECOND // 10
+
+class RingBuffer:
+    """Fixed-size PCM buffer addressed by absolute byte offsets"""
+
+    def __init__(self, capacity: int):
+        self.data = bytearray(capacity)
+        self.capacity = capacity
+        self.written = 0
+        self.closed = False
+        self.changed = asyncio.Condition()
+
+    async def write(self, chunk: bytes):
+        # Only the tail of an oversized chunk can be kept
+        if len(chunk) > self.capacity:
+            self.written += len(chunk) - self.capacity
+            chunk = chunk[-self.capacity:]
+
+        start = self.written % self.capacity
+        first = min(len(chunk), self.capacity - start)
+        self.data[start:start + first] = chunk[:first]
+        self.data[:len(chunk) - first] = chunk[first:]
+        self.written += len(chunk)
+
+        async with self.changed:
+            self.changed.notify_all()
+
+    async def close(self):
+        self.closed = True
+        async with self.changed:
+            self.changed.notify_all()
+
+    async def wait(self, offset: int):
+        """Wait until data past offset exists or the buffer is closed"""
+        async with self.changed:
+            await self.changed.wait_for(lambda: self.written > offset or self.closed)
+
+    def read(self, offset: int, size: int) -> Tuple[int, bytes]:
+        """Read up to size bytes at offset, skipping ahead if offset was overwritten"""
+        offset = max(offset, self.written - self.capacity)
+        size = min(size, self.written - offset)
+        if size <= 0:
+            return offset, b""
+
+        start = offset % self.capacity
+        first = min(size, self.capacity - start)
+        data = bytes(self.data[start:start + first]) + bytes(self.data[:size - first])
+        return offset + size, data
+
+class SharedDecode:
+    """One ffmpeg decode of a source, paced in real time into a ring buffer"""
+
+    def __init__(self, source: str, capacity: int):
+        self.source = source
+        self.ring = RingBuffer(capacity)
+        self.listeners: Dict[int, "Listener"] = {}
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def joinable(self) -> bool:
+        """New listeners can still start from the beginning"""
+        return not self.ring.closed and self.ring.written < self.ring.capacity
+
+    async def start(self):
+        self.process = await asyncio.create_subprocess_exec(
+            "ffmpeg", "-loglevel", "error", "-re", "-i", self.source,
+            "-f", "s16le", "-ac", str(CHANNELS), "-ar", str(SAMPLE_RATE), "pipe:1",
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+        self.task = asyncio.create_task(self.pump())
+
+    async def pump(self):
+        try:
+            while True:
+                chunk = await self.process.stdout.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                await self.ring.write(chunk)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Shared decode error: {e}")
+        finally:
+            await self.ring.close()
+
+    def stop(self):
+        if self.task:
+            self.task.cancel()
+        if self.process and self.process.returncode is None:
+            self.process.kill()
+
+class Listener:
+    """Copies a shared decode into one chat's FIFO from its own offset"""
+
+    OPEN_TIMEOUT = 15  # seconds for the call to open its end of the FIFO
+
+    def __init__(self, chat_id: int, decode: SharedDecode, path: str):
+        self.chat_id = chat_id
+        self.decode = decode
+        self.path = path
+        self.offset = 0
+        self.task: Optional[asyncio.Task] = None
+
+    async def open_fifo(self) -> int:
+        # Non-blocking open fails until a reader exists, so a call that never opens can't hang a thread
+        for _ in range(int(self.OPEN_TIMEOUT / 0.05)):
+            try:
+                # Stays non-blocking, writes wait on the loop instead of holding a thread
+                return os.open(self.path, os.O_WRONLY | os.O_NONBLOCK)
+            except OSError as e:
+                if e.errno != errno.ENXIO:
+                    raise
+            await asyncio.sleep(0.05)
+        raise TimeoutError(f"Nobody opened {self.path}")
+
+    async def feed(self):
+        fd = None
+        try:
+            fd = await self.open_fifo()
+            ring = self.decode.ring
+            while True:
+                await ring.wait(self.offset)
+                self.offset, data = ring.read(self.offset, CHUNK_SIZE)
+                if not data:
+                    if ring.closed:
+                        break
+                    continue
+                await self.write(fd, data)
+        except asyncio.CancelledError:
+            raise
+        except BrokenPipeError:
+            pass
+        except Exception as e:
+            logger.error(f"Fan-out listener error in {self.chat_id}: {e}")
+        finally:
+            if fd is not None:
+                os.close(fd)
+
+    @staticmethod
+    async def write(fd: int, data: bytes):
+        """Write all of data to the FIFO; the call reads in real time, which paces this listener"""
+        loop = asyncio.get_running_loop()
+        view = memoryview(data)
+        while view:
+            try:
+                view = view[os.write(fd, view):]
+            except BlockingIOError:
+                # The FIFO is full, resume once the call drained some of it
+                writable = loop.create_future()
+                loop.add_writer(fd, lambda: writable.done() or writable.set_result(None))
+                try:
+                    await writable
+                finally:
+                    loop.remove_writer(fd)
+
+class FanOut:
+    """Shares one fetch and decode between chats starting the same audio source"""
+
+    def __init__(self, directory: str = None, buffer_seconds: int = None):
+        self.directory = directory or Config.FANOUT_DIR
+        self.capacity = (buffer_seconds or Config.FANOUT_BUFFER_SECONDS) * BYTES_PER_SECOND
+        self.decodes: Dict[str, SharedDecode] = {}
+        self.listeners: Dict[int, Listener] = {}
+
+    def is_attached(self, chat_id: int) -> bool:
+        return chat_id in self.listeners
+
+    async def attach(self, chat_id: int, source: str) -> str:
+        """Start feeding source to a chat, returns the raw PCM FIFO path to play"""
+        self.detach(chat_id)
+
+        decode = self.decodes.get(source)
+        if not decode or not decode.joinable:
+            if decode and not decode.listeners:
+                decode.stop()
+            # A decode past its window keeps serving its listeners but takes no new ones
+            decode = SharedDecode(source, self.capacity)
+            await decode.start()
+            self.decodes[source] = decode
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{chat_id}_{uuid.uuid4().hex[:8]}.pcm")
+        os.mkfifo(path)
+
+        listener = Listener(chat_id, decode, path)
+        decode.listeners[chat_id] = listener
+        self.listeners[chat_id] = listener
+        listener.task = asyncio.create_task(listener.feed())
+        listener.task.add_done_callback(lambda _: self.finish(listener))
+        return path
+
+    def detach(self, chat_id: int):
+        listener = self.listeners.get(chat_id)
+        if listener and listener.task:
+            listener.task.cancel()
+        self.finish(listener)
+
+    def finish(self, listener: Optional[Listener]):
+        if not listener:
+            return
+        if self.listeners.get(listener.chat_id) is listener:
+            del self.listeners[listener.chat_id]
+
+        decode = listener.decode
+        if decode.listeners.get(listener.chat_id) is listener:
+            del decode.listeners[listener.chat_id]
+        if not decode.listeners:
+            decode.stop()
+            if self.decodes.get(decode.source) is decode:
+                del self.decodes[decode.source]
+
+        try:
+            os.remove(listener.path)
+        except OSError:
+            pass
+
+    def close(self):
+        for chat_id in list(self.listeners):
+            self.detach(chat_id)
+        for decode in list(self.decodes.values()):
+            decode.stop()
+        self.decodes.clear()
+
+    def get_stats(self) -> dict:
+        return {
+            "decodes": len(self.decodes),
+            "listeners": len(self.listeners)
+        }
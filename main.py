@@ -30,15 +30,21 @@ async def main():
         # Import and start the bot
         from bot import bot
         
+        # Start extraction backend
+        await bot.youtube_dl.initialize()
+        
         # Initialize music player
         await bot.music_player.initialize(bot.app)
         
         # Initialize broadcast manager
-        await bot.broadcast_manager.initialize_assistant()
+        await bot.broadcast_manager.initialize_assistant(bot.music_player.assistants.get_client())
         
         # Start the bot
         await bot.start_bot()
         
+        # Rejoin voice chats that were playing before the restart
+        await bot.music_player.restore()
+        
         # Keep the bot running
         await bot.app.idle()
         
@@ -50,10 +56,19 @@ async def main():
     finally:
         # Cleanup
         try:
+            bot.music_player.timers.stop()
+            if bot.music_player.fanout:
+                bot.music_player.fanout.close()
+            await bot.music_player.journal.close()
+            # Commit writes still waiting in the batch before the connection goes away
+            await bot.db.flush()
+            bot.youtube_dl.close()
             await bot.db.disconnect()
             await bot.app.stop()
-            if bot.broadcast_manager.assistant_client:
-                await bot.broadcast_manager.assistant_client.stop()
+            await bot.music_player.assistants.stop()
+            assistant_client = bot.broadcast_manager.assistant_client
+            if assistant_client and assistant_client is not bot.music_player.assistants.get_client():
+                await assistant_client.stop()
         except:
             pass
 
@@ -0,0 +1,150 @@
+import os
+import json
+import time
+import logging
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+class MediaCache:
+    """On-disk cache of downloaded media keyed by (video_id, format, quality).
+
+    Entries are kept in least-recently-used order and evicted once the total
+    size exceeds the byte budget. The index is stored next to the files so
+    the cache survives restarts.
+    """
+
+    INDEX_FILE = "index.json"
+
+    def __init__(self, cache_dir: str = None, max_bytes: int = None):
+        self.cache_dir = cache_dir or Config.MEDIA_CACHE_DIR
+        self.max_bytes = max_bytes if max_bytes is not None else Config.MEDIA_CACHE_MAX_BYTES
+        self.index_path = os.path.join(self.cache_dir, self.INDEX_FILE)
+        self.entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.load()
+
+    @staticmethod
+    def make_key(video_id: str, format_type: str, quality: str) -> str:
+        """Build cache key"""
+        return f"{video_id}:{format_type}:{quality}"
+
+    def load(self):
+        """Load index from disk, dropping entries whose files are gone"""
+        try:
+            if not os.path.exists(self.index_path):
+                return
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            # Stored oldest first, so insertion order rebuilds the LRU order
+            for key, entry in sorted(data.items(), key=lambda kv: kv[1].get("atime", 0)):
+                path = entry.get("path")
+                if path and os.path.isfile(path):
+                    entry["size"] = os.path.getsize(path)
+                    self.entries[key] = entry
+                    self.total_bytes += entry["size"]
+            logger.info(f"Media cache loaded: {len(self.entries)} files, {self.total_bytes} bytes")
+        except Exception as e:
+            logger.error(f"Failed to load media cache index: {e}")
+            self.entries.clear()
+            self.total_bytes = 0
+
+    def save(self):
+        """Atomically write index to disk"""
+        try:
+            tmp_path = self.index_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f)
+            os.replace(tmp_path, self.index_path)
+        except Exception as e:
+            logger.error(f"Failed to save media cache index: {e}")
+
+    def get(self, key: str) -> Optional[Tuple[str, Dict]]:
+        """Return (file_path, info) for a cached entry and mark it recently used"""
+        entry = self.entries.get(key)
+        if not entry:
+            self.misses += 1
+            return None
+
+        if not os.path.isfile(entry["path"]):
+            self._drop(key)
+            self.save()
+            self.misses += 1
+            return None
+
+        entry["atime"] = time.time()
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry["path"], entry.get("info", {})
+
+    def put(self, key: str, file_path: str, info: Dict = None) -> str:
+        """Move a downloaded file into the cache and return its new path"""
+        _, ext = os.path.splitext(file_path)
+        safe_name = key.replace(":", "_").replace("/", "_")
+        cached_path = os.path.join(self.cache_dir, f"{safe_name}{ext}")
+
+        if key in self.entries:
+            self._drop(key, remove_file=os.path.abspath(self.entries[key]["path"]) != os.path.abspath(file_path))
+
+        if os.path.abspath(file_path) != os.path.abspath(cached_path):
+            os.replace(file_path, cached_path)
+
+        size = os.path.getsize(cached_path)
+        self.entries[key] = {
+            "path": cached_path,
+            "size": size,
+            "atime": time.time(),
+            "info": info or {}
+        }
+        self.total_bytes += size
+
+        self.trim(keep=key)
+        self.save()
+        return cached_path
+
+    def trim(self, keep: str = None):
+        """Evict least recently used entries until the cache fits its budget"""
+        evicted = 0
+        for key in list(self.entries.keys()):
+            if self.total_bytes <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            self._drop(key)
+            evicted += 1
+
+        if evicted:
+            logger.info(f"Media cache evicted {evicted} files, {self.total_bytes} bytes in use")
+        return evicted
+
+    def contains(self, path: str) -> bool:
+        """Check if a path is managed by the cache"""
+        return os.path.abspath(os.path.dirname(path)) == os.path.abspath(self.cache_dir)
+
+    def _drop(self, key: str, remove_file: bool = True):
+        entry = self.entries.pop(key, None)
+        if not entry:
+            return
+        self.total_bytes -= entry.get("size", 0)
+        if remove_file:
+            try:
+                os.remove(entry["path"])
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.error(f"Failed to remove cached file {entry['path']}: {e}")
+
+    def get_stats(self) -> dict:
+        """Get cache statistics"""
+        return {
+            "files": len(self.entries),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses
+        }
@@ -1,138 +1,597 @@
 import asyncio
+import functools
 import os
-import random
-from typing import Dict, List, Optional
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Set
 from pyrogram import Client
+from pyrogram.handlers import DisconnectHandler
 from pyrogram.types import Message
 from pytgcalls import PyTgCalls, StreamType
-from pytgcalls.types.input_stream import AudioPiped, VideoPiped, AudioVideoPiped
+from pytgcalls.types.input_stream import (
+    AudioParameters, AudioPiped, AudioVideoPiped, InputAudioStream, InputStream, VideoPiped
+)
 from pytgcalls.exceptions import NoActiveGroupCall, GroupCallNotFound
+from config import Config
+from assistant_pool import Assistant, AssistantPool
+from fanout import CHANNELS, SAMPLE_RATE, FanOut
+from play_queue import PlayQueue
+from timer_wheel import TimerWheel
 import logging
 
 logger = logging.getLogger(__name__)
 
 class QueueItem:
+    __slots__ = ("title", "duration", "requester", "file_path", "stream_url", "is_video",
+                 "url", "position", "started_at")
+    
     def __init__(self, title: str, duration: str, requester: str, file_path: str = None, 
-                 stream_url: str = None, is_video: bool = False):
+                 stream_url: str = None, is_video: bool = False, url: str = None):
         self.title = title
         self.duration = duration
         self.requester = requester
         self.file_path = file_path
         self.stream_url = stream_url
         self.is_video = is_video
-        self.position = 0
+        self.url = url  # Source page URL, used to re-resolve stream_url
+        self.position = 0  # Media seconds played up to started_at
+        self.started_at = None  # Monotonic time playback last started or resumed
+    
+    def to_dict(self) -> dict:
+        return {
+            "title": self.title,
+            "duration": self.duration,
+            "requester": self.requester,
+            "file_path": self.file_path,
+            "stream_url": self.stream_url,
+            "is_video": self.is_video,
+            "url": self.url
+        }
+    
+    @classmethod
+    def from_dict(cls, data: dict) -> "QueueItem":
+        return cls(**data)
 
-class MusicPlayer:
+class ChatSession:
+    """Playback state of a single chat"""
+    __slots__ = ("queue", "current", "loop_mode", "loop_count", "is_paused", "speed",
+                 "prefetch_task", "generation")
+    
+    def __init__(self):
+        self.queue = PlayQueue()
+        self.current: Optional[QueueItem] = None
+        self.loop_mode = 0  # 0: off, 1: current, 2: queue
+        self.loop_count = 0
+        self.is_paused = False
+        self.speed = 1.0
+        self.prefetch_task: Optional[asyncio.Task] = None
+        self.generation = 0  # bumped on every stream start, tells stale stream-end events apart
+    
+    def cancel_tasks(self):
+        """Cancel background tasks owned by the session"""
+        if self.prefetch_task and not self.prefetch_task.done():
+            self.prefetch_task.cancel()
+        self.prefetch_task = None
+
+class ChatLock:
+    """Reentrant per-chat lock that records queue depth and wait time"""
+    __slots__ = ("lock", "owner", "waiting", "acquired", "total_wait", "max_wait")
+    
     def __init__(self):
-        self.pytgcalls = None
-        self.queues: Dict[int, List[QueueItem]] = {}
-        self.current_playing: Dict[int, QueueItem] = {}
-        self.loop_mode: Dict[int, int] = {}  # 0: off, 1: current, 2: queue
-        self.loop_count: Dict[int, int] = {}
-        self.is_paused: Dict[int, bool] = {}
-        self.playback_speed: Dict[int, float] = {}
-        self.active_chats: List[int] = []
+        self.lock = asyncio.Lock()
+        self.owner: Optional[asyncio.Task] = None
+        self.waiting = 0
+        self.acquired = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+    
+    def get_stats(self) -> dict:
+        return {
+            "pending": self.waiting + (1 if self.lock.locked() else 0),
+            "acquired": self.acquired,
+            "avg_wait_ms": round(self.total_wait / self.acquired * 1000, 2) if self.acquired else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 2)
+        }
+
+def serialized(method):
+    """Run a MusicPlayer method under the lock of the chat it is called for"""
+    @functools.wraps(method)
+    async def wrapper(self, chat_id: int, *args, **kwargs):
+        async with self.chat_lock(chat_id):
+            return await method(self, chat_id, *args, **kwargs)
+    return wrapper
+
+class MusicPlayer:
+    def __init__(self, youtube_dl=None, journal=None):
+        self.assistants = AssistantPool()
+        self.youtube_dl = youtube_dl
+        self.journal = journal
+        self.sessions: Dict[int, ChatSession] = {}
+        self.active_chats: Set[int] = set()
+        self.chat_locks: Dict[int, ChatLock] = {}
+        self.timers = TimerWheel()
+        self.fanout = FanOut() if Config.FANOUT_ENABLED else None
+        self.lock_acquired = 0
+        self.lock_total_wait = 0.0
+        self.lock_max_wait = 0.0
+        self.prefetch_semaphore = asyncio.Semaphore(Config.PREFETCH_MAX_CONCURRENT)
         
     async def initialize(self, client: Client):
-        """Initialize PyTgCalls"""
-        self.pytgcalls = PyTgCalls(client)
-        await self.pytgcalls.start()
+        """Start assistants, each with its own PyTgCalls"""
+        self.timers.start()
+        if Config.CACHE_RELEASE_INTERVAL > 0 and self.youtube_dl:
+            self.timers.schedule("cache_release", Config.CACHE_RELEASE_INTERVAL, self.release_cache)
         
-        # Set up handlers
-        @self.pytgcalls.on_stream_end()
+        for assistant in await self.assistants.start(client):
+            self.register_handlers(assistant)
+        logger.info(f"Voice chats run on {len(self.assistants.assistants)} assistant(s)")
+    
+    def register_handlers(self, assistant: Assistant):
+        @assistant.calls.on_stream_end()
         async def on_stream_end(client, update):
             chat_id = update.chat_id
+            # Events from an assistant the chat was moved away from
+            if self.assistants.get(chat_id) is not assistant:
+                return
             await self.handle_stream_end(chat_id)
             
-        @self.pytgcalls.on_closed_voice_chat()
+        @assistant.calls.on_closed_voice_chat()
         async def on_closed_vc(client, chat_id):
+            if self.assistants.get(chat_id) is not assistant:
+                return
+            await self.cleanup_chat(chat_id)
+        
+        if assistant.owned:
+            async def on_disconnect(client):
+                # Pyrogram reconnects by itself, chats only move if it stays offline
+                assistant.healthy = False
+                # Repeated disconnects of one outage must not keep pushing the deadline back
+                if not self.timers.pending(("failover", assistant.name)):
+                    self.timers.schedule(("failover", assistant.name), Config.ASSISTANT_FAILOVER_GRACE,
+                                         functools.partial(self.failover, assistant))
+            
+            assistant.client.add_handler(DisconnectHandler(on_disconnect))
+    
+    async def failover(self, assistant: Assistant):
+        """Move chats off an assistant that did not come back"""
+        if await self.assistants.probe(assistant):
+            assistant.healthy = True
+            await self.leave_moved(assistant)
+            return
+        
+        chat_ids = list(assistant.chats)
+        if chat_ids:
+            logger.warning(f"{assistant.name} offline, moving {len(chat_ids)} chats")
+            assistant.moved.update(chat_ids)
+            await asyncio.gather(*(self.move_chat(chat_id) for chat_id in chat_ids))
+        
+        # Keep checking so the assistant takes new chats again once it reconnects
+        self.timers.schedule(("failover", assistant.name), Config.ASSISTANT_FAILOVER_GRACE,
+                             functools.partial(self.failover, assistant))
+    
+    async def leave_moved(self, assistant: Assistant):
+        """Make a recovered assistant leave calls that another assistant carries now"""
+        chat_ids, assistant.moved = assistant.moved, set()
+        for chat_id in chat_ids:
+            if self.assistants.get(chat_id) is assistant:
+                continue
+            try:
+                await assistant.calls.leave_group_call(chat_id)
+            except Exception as e:
+                logger.debug(f"{assistant.name} was not in {chat_id} anymore: {e}")
+    
+    @serialized
+    async def move_chat(self, chat_id: int) -> bool:
+        """Continue a chat on another assistant from where it is"""
+        session = self.sessions.get(chat_id)
+        self.assistants.release(chat_id)
+        self.active_chats.discard(chat_id)
+        
+        if not session or not session.current:
+            await self.cleanup_chat(chat_id)
+            return False
+        
+        paused = session.is_paused
+        if not await self.play(chat_id, session.current, force=True, offset=self.get_exact_position(chat_id)):
+            await self.cleanup_chat(chat_id)
+            return False
+        if paused:
+            await self.pause(chat_id)
+        return True
+    
+    def calls(self, chat_id: int) -> PyTgCalls:
+        """PyTgCalls of the assistant carrying a chat"""
+        assistant = self.assistants.get(chat_id)
+        if not assistant:
+            raise RuntimeError(f"No assistant carries {chat_id}")
+        return assistant.calls
+    
+    @asynccontextmanager
+    async def chat_lock(self, chat_id: int):
+        """Serialize state changes of one chat; nested calls from the holder pass through"""
+        chat_lock = self.chat_locks.get(chat_id)
+        if not chat_lock:
+            chat_lock = self.chat_locks[chat_id] = ChatLock()
+        
+        task = asyncio.current_task()
+        if chat_lock.owner is task:
+            yield
+            return
+        
+        chat_lock.waiting += 1
+        started = time.monotonic()
+        try:
+            await chat_lock.lock.acquire()
+        finally:
+            chat_lock.waiting -= 1
+        
+        waited = time.monotonic() - started
+        chat_lock.acquired += 1
+        chat_lock.total_wait += waited
+        chat_lock.max_wait = max(chat_lock.max_wait, waited)
+        self.lock_acquired += 1
+        self.lock_total_wait += waited
+        self.lock_max_wait = max(self.lock_max_wait, waited)
+        
+        chat_lock.owner = task
+        try:
+            yield
+        finally:
+            chat_lock.owner = None
+            chat_lock.lock.release()
+            # Locks of chats without a session are dropped once nobody waits on them
+            if not chat_lock.waiting and chat_id not in self.sessions:
+                self.chat_locks.pop(chat_id, None)
+    
+    def get_lock_stats(self, chat_id: int = None) -> dict:
+        """Get lock queue depth and wait times for one chat or all chats"""
+        if chat_id is not None:
+            chat_lock = self.chat_locks.get(chat_id)
+            return chat_lock.get_stats() if chat_lock else ChatLock().get_stats()
+        
+        return {
+            "chats": len(self.chat_locks),
+            "pending": sum(chat_lock.get_stats()["pending"] for chat_lock in self.chat_locks.values()),
+            "acquired": self.lock_acquired,
+            "avg_wait_ms": round(self.lock_total_wait / self.lock_acquired * 1000, 2) if self.lock_acquired else 0.0,
+            "max_wait_ms": round(self.lock_max_wait * 1000, 2)
+        }
+    
+    def log(self, chat_id: int, op: str, **data):
+        """Record a state change in the queue journal"""
+        if self.journal:
+            self.journal.record(chat_id, op, **data)
+    
+    def log_position(self, chat_id: int):
+        session = self.sessions.get(chat_id)
+        if session and session.current:
+            self.log(chat_id, "position", position=self.get_exact_position(chat_id), at=time.time(),
+                     paused=session.is_paused, speed=session.speed)
+    
+    async def restore(self):
+        """Rejoin chats saved in the queue journal and resume near their last position"""
+        if not self.journal:
+            return
+        
+        started = time.monotonic()
+        states = await self.journal.load()
+        self.journal.start()
+        if not Config.QUEUE_RESTORE:
+            for chat_id in states:
+                self.log(chat_id, "stop")
+            return
+        
+        semaphore = asyncio.Semaphore(Config.RESTORE_CONCURRENCY)
+        
+        async def restore_limited(chat_id: int, state: dict) -> bool:
+            async with semaphore:
+                return await self.restore_chat(chat_id, state)
+        
+        results = await asyncio.gather(*(restore_limited(chat_id, state) for chat_id, state in states.items()))
+        logger.info(f"Restored {sum(results)}/{len(states)} chats in {time.monotonic() - started:.1f}s")
+    
+    @serialized
+    async def restore_chat(self, chat_id: int, state: dict) -> bool:
+        """Rebuild one chat from its journaled state"""
+        try:
+            if not state["current"]:
+                # Chats that were idle at shutdown would only sit waiting to auto leave
+                self.log(chat_id, "stop")
+                return False
+            
+            session = self.get_session(chat_id)
+            session.loop_mode = state["loop_mode"]
+            session.loop_count = state["loop_count"]
+            session.speed = state["speed"]
+            session.queue.extend(QueueItem.from_dict(data) for data in state["queue"])
+            
+            current = QueueItem.from_dict(state["current"])
+            # Journaled URLs that have not expired spare a fresh extraction per chat
+            if self.youtube_dl:
+                for item in [current, *session.queue]:
+                    if item.url and item.stream_url and not item.file_path:
+                        self.youtube_dl.seed_stream_url(item.url, item.stream_url,
+                                                        "video" if item.is_video else "audio")
+            duration = self.parse_duration(current.duration)
+            position = state["position"]
+            if duration and position >= duration - 5:
+                position = 0  # Too close to the end to resume, play it from the start
+            
+            if not await self.play(chat_id, current, force=True, offset=max(position, 0)):
+                await self.cleanup_chat(chat_id)
+                return False
+            if state["paused"]:
+                await self.pause(chat_id)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to restore {chat_id}: {e}")
             await self.cleanup_chat(chat_id)
+            return False
     
     async def join_voice_chat(self, chat_id: int) -> bool:
         """Join voice chat"""
+        assistant = self.assistants.place(chat_id)
+        if not assistant:
+            logger.error(f"Failed to join VC in {chat_id}: all assistants are full or offline")
+            return False
+        
         try:
-            await self.pytgcalls.join_group_call(
+            await assistant.calls.join_group_call(
                 chat_id,
                 AudioPiped("silence.mp3"),  # Dummy audio
                 stream_type=StreamType().local_stream
             )
-            if chat_id not in self.active_chats:
-                self.active_chats.append(chat_id)
+            self.active_chats.add(chat_id)
             return True
         except Exception as e:
-            logger.error(f"Failed to join VC in {chat_id}: {e}")
+            logger.error(f"Failed to join VC in {chat_id} with {assistant.name}: {e}")
+            self.assistants.release(chat_id)
             return False
     
+    @serialized
     async def leave_voice_chat(self, chat_id: int) -> bool:
         """Leave voice chat"""
         try:
-            await self.pytgcalls.leave_group_call(chat_id)
+            await self.calls(chat_id).leave_group_call(chat_id)
             await self.cleanup_chat(chat_id)
             return True
         except Exception as e:
             logger.error(f"Failed to leave VC in {chat_id}: {e}")
             return False
     
-    async def play(self, chat_id: int, item: QueueItem, force: bool = False) -> bool:
+    @serialized
+    async def play(self, chat_id: int, item: QueueItem, force: bool = False, offset: float = 0) -> bool:
         """Play a song"""
         try:
-            if force or not self.current_playing.get(chat_id):
+            session = self.get_session(chat_id)
+            if force or not session.current:
+                # Prefetched files can be evicted from the media cache meanwhile
+                if item.file_path and item.url and not os.path.exists(item.file_path):
+                    item.file_path = None
+                
+                # Resolve lazily queued items and re-validate URLs resolved at enqueue time;
+                # both are free when the stream URL cache still holds a valid entry
+                if not item.file_path and (item.url or not item.stream_url):
+                    if not await self.resolve(item):
+                        self.discard_idle_session(chat_id)
+                        return False
+                
                 # Join VC if not already joined
                 if chat_id not in self.active_chats:
                     success = await self.join_voice_chat(chat_id)
                     if not success:
+                        self.discard_idle_session(chat_id)
                         return False
                 
-                # Prepare stream
-                if item.is_video:
-                    if item.file_path:
-                        stream = AudioVideoPiped(item.file_path)
-                    else:
-                        stream = AudioVideoPiped(item.stream_url)
-                else:
-                    if item.file_path:
-                        stream = AudioPiped(item.file_path)
-                    else:
-                        stream = AudioPiped(item.stream_url)
-                
-                # Change stream
-                await self.pytgcalls.change_stream(
-                    chat_id,
-                    stream
-                )
+                await self.start_stream(chat_id, item, offset)
                 
-                self.current_playing[chat_id] = item
-                self.is_paused[chat_id] = False
+                session.current = item
+                self.log(chat_id, "play", item=item.to_dict(), position=offset, at=time.time(), speed=session.speed)
+                self.schedule_prefetch(chat_id)
                 return True
             else:
                 # Add to queue
-                await self.add_to_queue(chat_id, item)
-                return True
+                return await self.add_to_queue(chat_id, item)
                 
         except Exception as e:
             logger.error(f"Failed to play in {chat_id}: {e}")
+            self.discard_idle_session(chat_id)
+            return False
+    
+    async def start_stream(self, chat_id: int, item: QueueItem, offset: float = 0):
+        """Pipe an item into the call starting at offset seconds"""
+        session = self.get_session(chat_id)
+        try:
+            await self.calls(chat_id).change_stream(
+                chat_id,
+                await self.open_stream(chat_id, item, offset, session.speed)
+            )
+        except Exception as e:
+            # Cached stream URLs can still go stale, retry once with a fresh one
+            if item.file_path or not item.url or not self.youtube_dl:
+                raise
+            logger.warning(f"Stream failed in {chat_id}, re-resolving URL: {e}")
+            if not await self.resolve(item, refresh=True):
+                raise
+            await self.calls(chat_id).change_stream(
+                chat_id,
+                self.get_stream(item, offset, session.speed)
+            )
+        
+        item.position = offset
+        item.started_at = time.monotonic()
+        session.generation += 1
+        session.is_paused = False
+        self.timers.cancel(("leave", chat_id))
+        self.timers.cancel(("pause", chat_id))
+    
+    async def resolve(self, item: QueueItem, refresh: bool = False) -> bool:
+        """Resolve stream URL for an item queued without one"""
+        if not item.url or not self.youtube_dl:
             return False
+        format_type = "video" if item.is_video else "audio"
+        stream_url = await self.youtube_dl.get_stream_url(item.url, format_type, refresh=refresh)
+        if not stream_url:
+            return False
+        item.stream_url = stream_url
+        return True
+    
+    def schedule_prefetch(self, chat_id: int):
+        """Warm the next queued track while the current one plays"""
+        if Config.PREFETCH_MODE == "off" or not self.youtube_dl:
+            return
+        
+        session = self.sessions.get(chat_id)
+        if not session or not session.queue:
+            return
+        
+        if session.prefetch_task and not session.prefetch_task.done():
+            session.prefetch_task.cancel()
+        session.prefetch_task = asyncio.create_task(self.prefetch(session.queue[0]))
+    
+    async def prefetch(self, item: QueueItem):
+        """Resolve the stream URL of an item and optionally download it"""
+        if item.file_path or not item.url:
+            return
+        
+        try:
+            async with self.prefetch_semaphore:
+                if not await self.resolve(item):
+                    return
+                
+                if Config.PREFETCH_MODE != "download":
+                    return
+                
+                duration = self.parse_duration(item.duration)
+                if not duration or duration > Config.PREFETCH_MAX_DURATION:
+                    return
+                
+                result = await self.youtube_dl.download(item.url, "video" if item.is_video else "audio")
+                if result:
+                    item.file_path = result[0]
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Prefetch error for {item.title}: {e}")
+    
+    @staticmethod
+    def parse_duration(duration: str) -> int:
+        """Convert MM:SS or HH:MM:SS to seconds"""
+        try:
+            seconds = 0
+            for part in str(duration).split(":"):
+                seconds = seconds * 60 + int(part)
+            return seconds
+        except ValueError:
+            return 0
+    
+    async def open_stream(self, chat_id: int, item: QueueItem, offset: float = 0, speed: float = 1.0):
+        """Build input stream for a chat, sharing the decode of audio started from the top"""
+        if not self.fanout:
+            return self.get_stream(item, offset, speed)
+        
+        self.fanout.detach(chat_id)
+        if item.is_video or offset or speed != 1.0:
+            return self.get_stream(item, offset, speed)
+        
+        path = await self.fanout.attach(chat_id, item.file_path or item.stream_url)
+        return InputStream(InputAudioStream(path, AudioParameters(bitrate=SAMPLE_RATE, channels=CHANNELS)))
+    
+    def get_stream(self, item: QueueItem, offset: float = 0, speed: float = 1.0):
+        """Build input stream for a queue item"""
+        source = item.file_path or item.stream_url
+        ffmpeg_parameters = self.get_ffmpeg_parameters(offset, speed, item.is_video)
+        if item.is_video:
+            return AudioVideoPiped(source, additional_ffmpeg_parameters=ffmpeg_parameters)
+        return AudioPiped(source, additional_ffmpeg_parameters=ffmpeg_parameters)
+    
+    @staticmethod
+    def get_ffmpeg_parameters(offset: float = 0, speed: float = 1.0, is_video: bool = False) -> str:
+        """Build ffmpeg parameters for seeking and speed changes"""
+        parameters = []
+        
+        # Input-side -ss makes ffmpeg seek in the source instead of decoding up to offset
+        if offset:
+            parameters.append(f"-ss {offset:.2f}")
+        
+        if speed != 1.0:
+            # atempo only accepts 0.5-2.0 per instance, so chain filters for other values
+            tempos = []
+            remaining = speed
+            while remaining > 2.0:
+                tempos.append(2.0)
+                remaining /= 2.0
+            while remaining < 0.5:
+                tempos.append(0.5)
+                remaining /= 0.5
+            tempos.append(remaining)
+            
+            # -atmid places the filters after the input, where output options belong
+            parameters.append("-atmid")
+            parameters.append("-filter:a " + ",".join(f"atempo={tempo:.4f}" for tempo in tempos))
+            if is_video:
+                parameters.append(f"-filter:v setpts={1 / speed:.4f}*PTS")
+        
+        return " ".join(parameters)
+    
+    def get_exact_position(self, chat_id: int) -> float:
+        """Get media position of the current item in seconds"""
+        session = self.sessions.get(chat_id)
+        if not session or not session.current:
+            return 0.0
+        current = session.current
+        position = current.position
+        if current.started_at is not None:
+            position += (time.monotonic() - current.started_at) * session.speed
+        return position
+    
+    def get_position(self, chat_id: int) -> int:
+        """Get playback position of the current item in whole seconds"""
+        return int(self.get_exact_position(chat_id))
     
+    @serialized
     async def pause(self, chat_id: int) -> bool:
         """Pause playback"""
         try:
-            await self.pytgcalls.pause_stream(chat_id)
-            self.is_paused[chat_id] = True
+            await self.calls(chat_id).pause_stream(chat_id)
+            session = self.get_session(chat_id)
+            current = session.current
+            if current and current.started_at is not None:
+                current.position = self.get_exact_position(chat_id)
+                current.started_at = None
+            session.is_paused = True
+            self.log_position(chat_id)
+            if Config.MAX_PAUSE_TIME > 0:
+                self.timers.schedule(("pause", chat_id), Config.MAX_PAUSE_TIME,
+                                     functools.partial(self.pause_timeout, chat_id))
             return True
         except Exception as e:
             logger.error(f"Failed to pause in {chat_id}: {e}")
             return False
     
+    @serialized
     async def resume(self, chat_id: int) -> bool:
         """Resume playback"""
         try:
-            await self.pytgcalls.resume_stream(chat_id)
-            self.is_paused[chat_id] = False
+            await self.calls(chat_id).resume_stream(chat_id)
+            session = self.get_session(chat_id)
+            current = session.current
+            if current and current.started_at is None:
+                current.started_at = time.monotonic()
+            session.is_paused = False
+            self.timers.cancel(("pause", chat_id))
+            
+            # A shared decode kept running during the pause, so rejoin at our own position
+            if self.fanout and self.fanout.is_attached(chat_id) and current:
+                await self.start_stream(chat_id, current, current.position)
+            
+            self.log_position(chat_id)
             return True
         except Exception as e:
             logger.error(f"Failed to resume in {chat_id}: {e}")
             return False
     
+    @serialized
     async def skip(self, chat_id: int) -> bool:
         """Skip current song"""
         try:
@@ -142,150 +601,327 @@ class MusicPlayer:
             logger.error(f"Failed to skip in {chat_id}: {e}")
             return False
     
+    @serialized
     async def stop(self, chat_id: int) -> bool:
         """Stop playback"""
         try:
-            await self.pytgcalls.leave_group_call(chat_id)
+            await self.calls(chat_id).leave_group_call(chat_id)
             await self.cleanup_chat(chat_id)
             return True
         except Exception as e:
             logger.error(f"Failed to stop in {chat_id}: {e}")
             return False
     
+    @serialized
     async def set_speed(self, chat_id: int, speed: float) -> bool:
-        """Set playback speed"""
+        """Set playback speed, resuming the current item where it is"""
         try:
-            # Note: This would require custom implementation with FFmpeg
-            self.playback_speed[chat_id] = speed
-            # Restart current stream with new speed
-            current = self.current_playing.get(chat_id)
-            if current:
-                await self.play(chat_id, current, force=True)
+            session = self.sessions.get(chat_id)
+            if not session:
+                return False
+            # Position must be taken at the old speed before switching
+            position = self.get_exact_position(chat_id)
+            session.speed = speed
+            
+            # Restart the same source with the atempo chain applied
+            if session.current:
+                await self.start_stream(chat_id, session.current, position)
+                self.log_position(chat_id)
             return True
         except Exception as e:
             logger.error(f"Failed to set speed in {chat_id}: {e}")
             return False
     
+    @serialized
     async def seek(self, chat_id: int, seconds: int) -> bool:
-        """Seek to position"""
+        """Seek by restarting the stream at an input offset, reusing the resolved URL or cached file"""
         try:
-            current = self.current_playing.get(chat_id)
-            if current:
-                current.position = seconds
-                # This would require custom implementation
-                return True
-            return False
+            current = self.get_current_playing(chat_id)
+            if not current:
+                return False
+            
+            duration = self.parse_duration(current.duration)
+            if seconds < 0 or (duration and seconds >= duration):
+                return False
+            
+            await self.start_stream(chat_id, current, seconds)
+            self.log_position(chat_id)
+            return True
         except Exception as e:
             logger.error(f"Failed to seek in {chat_id}: {e}")
             return False
     
-    async def add_to_queue(self, chat_id: int, item: QueueItem):
+    def get_session(self, chat_id: int) -> ChatSession:
+        """Get or create the session of a chat"""
+        session = self.sessions.get(chat_id)
+        if not session:
+            session = self.sessions[chat_id] = ChatSession()
+        return session
+    
+    def discard_idle_session(self, chat_id: int):
+        """Drop a session that never got anything to play, e.g. after a failed join"""
+        session = self.sessions.get(chat_id)
+        if session and not session.current and not session.queue and chat_id not in self.active_chats:
+            session.cancel_tasks()
+            del self.sessions[chat_id]
+    
+    def is_queue_full(self, chat_id: int) -> bool:
+        """Check if the queue reached Config.QUEUE_LIMIT"""
+        session = self.sessions.get(chat_id)
+        return bool(session) and len(session.queue) >= Config.QUEUE_LIMIT
+    
+    @serialized
+    async def add_to_queue(self, chat_id: int, item: QueueItem) -> bool:
         """Add item to queue"""
-        if chat_id not in self.queues:
-            self.queues[chat_id] = []
-        self.queues[chat_id].append(item)
+        session = self.get_session(chat_id)
+        if len(session.queue) >= Config.QUEUE_LIMIT:
+            return False
+        session.queue.append(item)
+        self.log(chat_id, "push", items=[item.to_dict()])
+        
+        # A new "next up" track gets warmed right away
+        if len(session.queue) == 1 and session.current:
+            self.schedule_prefetch(chat_id)
+        return True
+    
+    @serialized
+    async def add_many_to_queue(self, chat_id: int, items: List[QueueItem]) -> int:
+        """Add several items to queue at once, returns how many fit"""
+        session = self.get_session(chat_id)
+        was_empty = not session.queue
+        items = items[:max(Config.QUEUE_LIMIT - len(session.queue), 0)]
+        session.queue.extend(items)
+        if items:
+            self.log(chat_id, "push", items=[item.to_dict() for item in items])
+        
+        if was_empty and items and session.current:
+            self.schedule_prefetch(chat_id)
+        return len(items)
     
     async def get_queue(self, chat_id: int) -> List[QueueItem]:
         """Get current queue"""
-        return self.queues.get(chat_id, [])
+        session = self.sessions.get(chat_id)
+        return session.queue.to_list() if session else []
+    
+    def get_queue_length(self, chat_id: int) -> int:
+        """Get number of queued items without copying the queue"""
+        session = self.sessions.get(chat_id)
+        return len(session.queue) if session else 0
+    
+    @serialized
+    async def remove_from_queue(self, chat_id: int, index: int) -> Optional[QueueItem]:
+        """Remove the item at a 0-based queue index"""
+        try:
+            session = self.sessions.get(chat_id)
+            if not session:
+                return None
+            item = session.queue.remove_at(index)
+            self.log(chat_id, "remove", index=index)
+            if index == 0:
+                self.schedule_prefetch(chat_id)
+            return item
+        except IndexError:
+            return None
+        except Exception as e:
+            logger.error(f"Failed to remove from queue in {chat_id}: {e}")
+            return None
+    
+    @serialized
+    async def move_in_queue(self, chat_id: int, src: int, dst: int) -> Optional[QueueItem]:
+        """Move a queued item between 0-based indexes"""
+        try:
+            session = self.sessions.get(chat_id)
+            if not session or not 0 <= dst < len(session.queue):
+                return None
+            item = session.queue.move(src, dst)
+            self.log(chat_id, "move", src=src, dst=dst)
+            if 0 in (src, dst):
+                self.schedule_prefetch(chat_id)
+            return item
+        except IndexError:
+            return None
+        except Exception as e:
+            logger.error(f"Failed to move in queue in {chat_id}: {e}")
+            return None
     
+    @serialized
+    async def skip_to(self, chat_id: int, index: int) -> Optional[QueueItem]:
+        """Drop queued items before a 0-based index and play the one at it"""
+        try:
+            session = self.sessions.get(chat_id)
+            if not session or not 0 <= index < len(session.queue):
+                return None
+            item = session.queue.jump(index)
+            self.log(chat_id, "jump", index=index)
+            if await self.play(chat_id, item, force=True):
+                return item
+            # Fall through to the next playable item like a normal skip
+            await self.handle_stream_end(chat_id)
+            return None
+        except Exception as e:
+            logger.error(f"Failed to skip to {index} in {chat_id}: {e}")
+            return None
+    
+    @serialized
     async def shuffle_queue(self, chat_id: int) -> bool:
         """Shuffle queue"""
         try:
-            queue = self.queues.get(chat_id, [])
-            if len(queue) > 1:
-                random.shuffle(queue)
-                self.queues[chat_id] = queue
+            session = self.sessions.get(chat_id)
+            if session and len(session.queue) > 1:
+                session.queue.shuffle()
+                self.log(chat_id, "reset", items=[item.to_dict() for item in session.queue])
+                self.schedule_prefetch(chat_id)
                 return True
             return False
         except Exception as e:
             logger.error(f"Failed to shuffle queue in {chat_id}: {e}")
             return False
     
+    @serialized
     async def clear_queue(self, chat_id: int):
         """Clear queue"""
-        self.queues[chat_id] = []
+        session = self.sessions.get(chat_id)
+        if session:
+            session.queue.clear()
+            self.log(chat_id, "clear")
     
-    async def set_loop(self, chat_id: int, mode: int, count: int = 0):
-        """Set loop mode"""
-        self.loop_mode[chat_id] = mode
+    @serialized
+    async def set_loop(self, chat_id: int, mode: int, count: int = 0) -> bool:
+        """Set loop mode, False when nothing plays in the chat"""
+        session = self.sessions.get(chat_id)
+        if not session:
+            return False
+        session.loop_mode = mode
         if count > 0:
-            self.loop_count[chat_id] = count
+            session.loop_count = count
+        self.log(chat_id, "loop", mode=session.loop_mode, count=session.loop_count)
+        return True
+    
+    def get_loop_mode(self, chat_id: int) -> int:
+        """Get loop mode of a chat"""
+        session = self.sessions.get(chat_id)
+        return session.loop_mode if session else 0
     
     async def handle_stream_end(self, chat_id: int):
         """Handle when stream ends"""
+        # Note which stream ended before waiting on the lock, a skip that gets there first replaces it
+        session = self.sessions.get(chat_id)
+        if session:
+            await self.advance(chat_id, session, session.generation)
+    
+    @serialized
+    async def advance(self, chat_id: int, ended: ChatSession, generation: int):
+        """Move on from the stream of a session with the given generation to the next item"""
         try:
-            current = self.current_playing.get(chat_id)
-            loop_mode = self.loop_mode.get(chat_id, 0)
+            # Late stream-end events for a chat that was stopped meanwhile
+            if chat_id not in self.active_chats:
+                return
+            
+            # The stream that ended was already replaced, by a skip, a seek or a new session
+            session = self.sessions.get(chat_id)
+            if session is not ended or generation != session.generation:
+                return
+            current = session.current
+            loop_mode = session.loop_mode
             
             # Handle loop
             if loop_mode == 1 and current:  # Loop current
-                count = self.loop_count.get(chat_id, 0)
+                count = session.loop_count
                 if count > 0:
-                    self.loop_count[chat_id] = count - 1
+                    session.loop_count = count - 1
+                    self.log(chat_id, "loop", mode=loop_mode, count=session.loop_count)
                     await self.play(chat_id, current, force=True)
                     return
                 elif count == 0:  # Infinite loop
                     await self.play(chat_id, current, force=True)
                     return
             
-            # Play next in queue
-            queue = self.queues.get(chat_id, [])
-            if queue:
-                next_item = queue.pop(0)
-                await self.play(chat_id, next_item, force=True)
-                
-                # Handle queue loop
-                if loop_mode == 2 and current:
-                    await self.add_to_queue(chat_id, current)
-            else:
-                # No more songs, leave after timeout
-                self.current_playing.pop(chat_id, None)
-                asyncio.create_task(self.auto_leave(chat_id))
+            # Handle queue loop; rotating the current item back is exempt from QUEUE_LIMIT
+            if loop_mode == 2 and current:
+                session.queue.append(current)
+                self.log(chat_id, "push", items=[current.to_dict()])
+            
+            # Play next in queue, skipping items that fail to resolve or start
+            while session.queue:
+                next_item = session.queue.popleft()
+                self.log(chat_id, "pop")
+                if await self.play(chat_id, next_item, force=True):
+                    return
+                logger.warning(f"Skipping unplayable item in {chat_id}: {next_item.title}")
+            
+            # No more songs, leave after timeout
+            session.current = None
+            self.log(chat_id, "idle")
+            self.timers.schedule(("leave", chat_id), Config.AUTO_LEAVE_TIME,
+                                 functools.partial(self.auto_leave, chat_id))
                 
         except Exception as e:
             logger.error(f"Error handling stream end in {chat_id}: {e}")
     
+    @serialized
     async def auto_leave(self, chat_id: int):
         """Auto leave after inactivity"""
-        await asyncio.sleep(300)  # 5 minutes
-        if chat_id in self.active_chats and not self.current_playing.get(chat_id):
+        if chat_id in self.active_chats and not self.get_current_playing(chat_id):
             await self.leave_voice_chat(chat_id)
     
+    @serialized
+    async def pause_timeout(self, chat_id: int):
+        """Stop chats that stayed paused for too long"""
+        session = self.sessions.get(chat_id)
+        if session and session.is_paused:
+            logger.info(f"Stopping {chat_id} after {Config.MAX_PAUSE_TIME}s paused")
+            await self.stop(chat_id)
+    
+    async def release_cache(self):
+        """Trim the media cache periodically"""
+        try:
+            # The cache index is shared with lookups on the loop, only the directory sweep leaves it
+            self.youtube_dl.trim_cache()
+            await asyncio.to_thread(self.youtube_dl.sweep_downloads)
+        except Exception as e:
+            logger.error(f"Cache release error: {e}")
+        finally:
+            self.timers.schedule("cache_release", Config.CACHE_RELEASE_INTERVAL, self.release_cache)
+    
+    @serialized
     async def cleanup_chat(self, chat_id: int):
         """Cleanup chat data"""
-        self.current_playing.pop(chat_id, None)
-        self.queues.pop(chat_id, None)
-        self.loop_mode.pop(chat_id, None)
-        self.loop_count.pop(chat_id, None)
-        self.is_paused.pop(chat_id, None)
-        self.playback_speed.pop(chat_id, None)
-        if chat_id in self.active_chats:
-            self.active_chats.remove(chat_id)
+        session = self.sessions.pop(chat_id, None)
+        if session:
+            session.cancel_tasks()
+            self.log(chat_id, "stop")
+        self.timers.cancel(("leave", chat_id))
+        self.timers.cancel(("pause", chat_id))
+        self.assistants.release(chat_id)
+        self.active_chats.discard(chat_id)
+        if self.fanout:
+            self.fanout.detach(chat_id)
     
     def get_current_playing(self, chat_id: int) -> Optional[QueueItem]:
         """Get currently playing item"""
-        return self.current_playing.get(chat_id)
+        session = self.sessions.get(chat_id)
+        return session.current if session else None
     
     def is_playing(self, chat_id: int) -> bool:
         """Check if something is playing"""
-        return chat_id in self.current_playing and not self.is_paused.get(chat_id, False)
+        session = self.sessions.get(chat_id)
+        return bool(session and session.current and not session.is_paused)
     
     def get_total_queue_count(self) -> int:
         """Get total songs in all queues"""
-        return sum(len(queue) for queue in self.queues.values())
+        return sum(len(session.queue) for session in self.sessions.values())
     
     async def get_chat_info(self, chat_id: int) -> dict:
         """Get chat playback info"""
-        current = self.current_playing.get(chat_id)
-        queue = self.queues.get(chat_id, [])
+        session = self.sessions.get(chat_id) or ChatSession()
         
         return {
-            "current": current,
-            "queue_count": len(queue),
+            "current": session.current,
+            "queue_count": len(session.queue),
             "is_playing": self.is_playing(chat_id),
-            "is_paused": self.is_paused.get(chat_id, False),
-            "loop_mode": self.loop_mode.get(chat_id, 0),
-            "speed": self.playback_speed.get(chat_id, 1.0)
+            "is_paused": session.is_paused,
+            "loop_mode": session.loop_mode,
+            "speed": session.speed,
+            "lock": self.get_lock_stats(chat_id)
         }
     
@@ -0,0 +1,139 @@
+import random
+from collections import deque
+from typing import Any, Deque, Iterator, List
+
+class PlayQueue:
+    """Chunked queue with O(1) ends and cheap indexed remove/move/jump"""
+
+    CHUNK_SIZE = 64
+
+    def __init__(self, items=None):
+        self.chunks: Deque[Deque[Any]] = deque()
+        self.size = 0
+        if items:
+            self.extend(items)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __iter__(self) -> Iterator[Any]:
+        for chunk in self.chunks:
+            yield from chunk
+
+    def __getitem__(self, index: int) -> Any:
+        position, offset = self.locate(index)
+        return self.chunks[position][offset]
+
+    def locate(self, index: int):
+        """Find the position of the chunk holding index and the offset inside it"""
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError("queue index out of range")
+
+        # Walking whole chunks skips CHUNK_SIZE items per step
+        for position, chunk in enumerate(self.chunks):
+            if index < len(chunk):
+                return position, index
+            index -= len(chunk)
+        raise IndexError("queue index out of range")
+
+    def append(self, item: Any):
+        """Add item to the end"""
+        if not self.chunks or len(self.chunks[-1]) >= self.CHUNK_SIZE:
+            self.chunks.append(deque())
+        self.chunks[-1].append(item)
+        self.size += 1
+
+    def extend(self, items):
+        """Add several items to the end"""
+        for item in items:
+            self.append(item)
+
+    def popleft(self) -> Any:
+        """Remove and return the first item"""
+        if not self.size:
+            raise IndexError("pop from an empty queue")
+        chunk = self.chunks[0]
+        item = chunk.popleft()
+        if not chunk:
+            self.chunks.popleft()
+        self.size -= 1
+        return item
+
+    def remove_at(self, index: int) -> Any:
+        """Remove and return the item at index"""
+        position, offset = self.locate(index)
+        chunk = self.chunks[position]
+        item = chunk[offset]
+        del chunk[offset]
+        if not chunk:
+            del self.chunks[position]
+        else:
+            self.merge(position)
+        self.size -= 1
+        return item
+
+    def insert(self, index: int, item: Any):
+        """Insert item before index"""
+        if index >= self.size:
+            self.append(item)
+            return
+
+        position, offset = self.locate(max(index, 0))
+        chunk = self.chunks[position]
+        chunk.insert(offset, item)
+        self.size += 1
+        self.split(position)
+
+    def split(self, position: int):
+        """Split an oversized chunk so every chunk stays cheap to index into"""
+        chunk = self.chunks[position]
+        if len(chunk) > self.CHUNK_SIZE * 2:
+            half = deque(chunk.popleft() for _ in range(len(chunk) // 2))
+            self.chunks.insert(position, half)
+
+    def merge(self, position: int):
+        """Fold an undersized chunk into a neighbour so locate keeps skipping whole chunks"""
+        if len(self.chunks[position]) >= self.CHUNK_SIZE // 2 or len(self.chunks) < 2:
+            return
+        left = position if position + 1 < len(self.chunks) else position - 1
+        self.chunks[left].extend(self.chunks[left + 1])
+        del self.chunks[left + 1]
+        self.split(left)
+
+    def move(self, src: int, dst: int) -> Any:
+        """Move the item at src so it ends up at dst"""
+        item = self.remove_at(src)
+        self.insert(dst, item)
+        return item
+
+    def jump(self, index: int) -> Any:
+        """Drop every item before index and pop the item at index"""
+        position, offset = self.locate(index)
+
+        # Chunks in front of the target go away whole
+        for _ in range(position):
+            self.size -= len(self.chunks.popleft())
+        chunk = self.chunks[0]
+        for _ in range(offset):
+            chunk.popleft()
+        self.size -= offset
+
+        return self.popleft()
+
+    def shuffle(self):
+        """Shuffle items in place"""
+        items = list(self)
+        random.shuffle(items)
+        self.clear()
+        self.extend(items)
+
+    def clear(self):
+        """Remove all items"""
+        self.chunks.clear()
+        self.size = 0
+
+    def to_list(self) -> List[Any]:
+        """Copy items into a list"""
+        return list(self)
@@ -85,7 +85,7 @@ async def global_unban_user(client: Client, message: Message):
     
     try:
         # Check if user is banned
-        is_banned = await bot.db.is_user_banned(user_id)
+        is_banned = bot.db.is_user_banned(user_id)
         if not is_banned:
             await message.reply_text("❌ User is not banned!")
             return
@@ -183,7 +183,7 @@ async def whitelist_chat(client: Client, message: Message):
     try:
         chat_id = int(message.command[1])
         
-        is_blacklisted = await bot.db.is_chat_blacklisted(chat_id)
+        is_blacklisted = bot.db.is_chat_blacklisted(chat_id)
         if not is_blacklisted:
             await message.reply_text("❌ Chat is not blacklisted!")
             return
@@ -298,7 +298,7 @@ async def authorize_user(client: Client, message: Message):
             await message.reply_text("❌ User is already authorized!")
             return
         
-        await bot.db.authorize_user(chat_id, user_id, message.from_user.id)
+        await bot.auth_manager.authorize_user_in_chat(chat_id, user_id, message.from_user.id)
         
         await message.reply_text(
             f"✅ **User Authorized**\n\n"
@@ -358,7 +358,7 @@ async def unauthorize_user(client: Client, message: Message):
             await message.reply_text("❌ User is not authorized!")
             return
         
-        await bot.db.unauthorize_user(chat_id, user_id)
+        await bot.auth_manager.unauthorize_user_in_chat(chat_id, user_id)
         
         await message.reply_text(
             f"❌ **User Authorization Removed**\n\n"
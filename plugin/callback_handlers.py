@@ -1,5 +1,8 @@
+import os
 from pyrogram import Client, filters
 from pyrogram.types import CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
+from pyrogram.errors import BadRequest
+from youtube_downloader import ProgressBridge
 import logging
 
 logger = logging.getLogger(__name__)
@@ -56,6 +59,37 @@ async def handle_song_download(client: Client, callback_query: CallbackQuery):
         logger.error(f"Download callback error: {e}")
         await callback_query.edit_message_text("❌ An error occurred!")
 
+def get_download_caption(callback_query: CallbackQuery, info: dict, format_type: str) -> str:
+    """Build caption for a sent download"""
+    return (
+        f"🎵 **Downloaded Successfully!**\n\n"
+        f"**Title:** {info['title']}\n"
+        f"**Duration:** {info['duration']}\n"
+        f"**Uploader:** {info['uploader']}\n"
+        f"**Format:** {format_type.upper()}\n"
+        f"**Requested by:** {callback_query.from_user.mention}"
+    )
+
+async def send_download(callback_query: CallbackQuery, media: str, info: dict, format_type: str,
+                        file_name: str = None):
+    """Send audio/video by local path or Telegram file_id"""
+    caption = get_download_caption(callback_query, info, format_type)
+    
+    if format_type == "audio":
+        return await callback_query.message.reply_audio(
+            media,
+            caption=caption,
+            performer=info['uploader'],
+            title=info['title'],
+            file_name=file_name
+        )
+    
+    return await callback_query.message.reply_video(
+        media,
+        caption=caption,
+        file_name=file_name
+    )
+
 @Client.on_callback_query(filters.regex("^dl_"))
 async def handle_download_format(client: Client, callback_query: CallbackQuery):
     bot = get_bot_instance(client)
@@ -68,6 +102,29 @@ async def handle_download_format(client: Client, callback_query: CallbackQuery):
         
         video_url = f"https://youtube.com/watch?v={video_id}"
         
+        # Resend a previously uploaded file without downloading again
+        cached = await bot.db.get_file_id(video_id, format_type)
+        if cached:
+            try:
+                await send_download(callback_query, cached['file_id'], cached, format_type)
+            except (BadRequest, ValueError) as e:
+                # Expired or invalid file_id, fall back to a fresh upload
+                logger.warning(f"Stale file_id for {video_id} ({format_type}): {e}")
+                await bot.db.delete_file_id(video_id, format_type)
+            else:
+                # The file is out, failures from here on must not count against the file_id
+                await bot.db.add_download(
+                    callback_query.from_user.id,
+                    callback_query.message.chat.id,
+                    cached['title'],
+                    video_url,
+                    None,
+                    format_type,
+                    cached.get('file_size', 0)
+                )
+                await callback_query.edit_message_text("✅ **Download completed and sent!**")
+                return
+        
         # Update message to show download progress
         await callback_query.edit_message_text("📥 **Downloading... Please wait**")
         
@@ -84,13 +141,19 @@ async def handle_download_format(client: Client, callback_query: CallbackQuery):
                     except:
                         pass
         
+        # yt-dlp calls hooks from a worker thread, the bridge rate-limits edits on the loop
+        progress = ProgressBridge(progress_callback)
+        
         # Start download
-        result = await bot.youtube_dl.download(
-            video_url, 
-            format_type, 
-            "best",
-            progress_callback
-        )
+        try:
+            result = await bot.youtube_dl.download(
+                video_url, 
+                format_type, 
+                "best",
+                progress
+            )
+        finally:
+            progress.close()
         
         if result:
             file_path, info = result
@@ -107,36 +170,30 @@ async def handle_download_format(client: Client, callback_query: CallbackQuery):
             )
             
             # Send the file
-            caption = (
-                f"🎵 **Downloaded Successfully!**\n\n"
-                f"**Title:** {info['title']}\n"
-                f"**Duration:** {info['duration']}\n"
-                f"**Uploader:** {info['uploader']}\n"
-                f"**Format:** {format_type.upper()}\n"
-                f"**Requested by:** {callback_query.from_user.mention}"
-            )
+            file_name = f"{info['title']}{os.path.splitext(file_path)[1]}"
+            sent = await send_download(callback_query, file_path, info, format_type, file_name)
             
-            if format_type == "audio":
-                await callback_query.message.reply_audio(
-                    file_path,
-                    caption=caption,
-                    performer=info['uploader'],
-                    title=info['title']
-                )
-            else:
-                await callback_query.message.reply_video(
-                    file_path,
-                    caption=caption
+            # Remember file_id so repeat requests skip download and upload
+            media = sent.audio if format_type == "audio" else sent.video
+            if media:
+                await bot.db.save_file_id(
+                    video_id,
+                    format_type,
+                    media.file_id,
+                    info['title'],
+                    info['duration'],
+                    info['uploader'],
+                    info.get('file_size', 0)
                 )
             
             await callback_query.edit_message_text("✅ **Download completed and sent!**")
             
-            # Clean up file after sending
-            try:
-                import os
-                os.remove(file_path)
-            except:
-                pass
+            # Cached files are kept for repeat requests
+            if not bot.youtube_dl.cache.contains(file_path):
+                try:
+                    os.remove(file_path)
+                except:
+                    pass
                 
         else:
             await callback_query.edit_message_text("❌ **Download failed!**")
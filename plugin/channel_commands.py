@@ -1,6 +1,7 @@
 from pyrogram import Client, filters
 from pyrogram.types import Message
 from pyrogram.enums import ChatMemberStatus
+from config import Config
 import logging
 
 logger = logging.getLogger(__name__)
@@ -113,6 +114,10 @@ async def channel_play_audio(client: Client, message: Message):
     
     query = " ".join(message.command[1:])
     
+    if bot.music_player.get_current_playing(channel_id) and bot.music_player.is_queue_full(channel_id):
+        await message.reply_text(f"❌ Channel queue is full! (limit: {Config.QUEUE_LIMIT} songs)")
+        return
+    
     # Search and play in channel
     search_msg = await message.reply_text("🔍 **Searching for channel playback...**")
     
@@ -141,6 +146,7 @@ async def channel_play_audio(client: Client, message: Message):
             duration=result['duration'],
             requester=message.from_user.mention,
             stream_url=stream_url,
+            url=result['url'],
             is_video=False
         )
         
@@ -193,6 +199,10 @@ async def channel_play_video(client: Client, message: Message):
     
     query = " ".join(message.command[1:])
     
+    if bot.music_player.get_current_playing(channel_id) and bot.music_player.is_queue_full(channel_id):
+        await message.reply_text(f"❌ Channel queue is full! (limit: {Config.QUEUE_LIMIT} songs)")
+        return
+    
     # Similar to cplay but with video
     search_msg = await message.reply_text("🔍 **Searching for video playback in channel...**")
     
@@ -216,6 +226,7 @@ async def channel_play_video(client: Client, message: Message):
             duration=result['duration'],
             requester=message.from_user.mention,
             stream_url=stream_url,
+            url=result['url'],
             is_video=True
         )
         
@@ -286,6 +297,7 @@ async def channel_force_play(client: Client, message: Message):
             duration=result['duration'],
             requester=message.from_user.mention,
             stream_url=stream_url,
+            url=result['url'],
             is_video=is_video
         )
         
@@ -442,7 +454,7 @@ async def show_connected_channel(client: Client, message: Message):
         
         # Get channel status
         current = bot.music_player.get_current_playing(channel_id) if bot else None
-        queue_count = len(await bot.music_player.get_queue(channel_id)) if bot else 0
+        queue_count = bot.music_player.get_queue_length(channel_id) if bot else 0
         
         status = "🎵 Playing" if current else "⏸ Idle"
         
@@ -458,103 +470,4 @@ async def show_connected_channel(client: Client, message: Message):
         
     except Exception as e:
         logger.error(f"Show connected error: {e}")
-        await message.reply_text("❌ Failed to get channel info!")title
-    except:
-        channel_name = "Connected Channel"
-    
-    text = f"📝 **{channel_name} Queue:**\n\n"
-    
-    if current:
-        text += f"🎵 **Now Playing:**\n**{current.title}** | `{current.duration}`\n**Requested by:** {current.requester}\n\n"
-    
-    if queue:
-        text += "**📋 Up Next:**\n"
-        for i, item in enumerate(queue[:10], 1):
-            text += f"`{i}.` **{item.title}** | `{item.duration}`\n"
-        
-        if len(queue) > 10:
-            text += f"\n**... and {len(queue) - 10} more songs**"
-    
-    await message.reply_text(text)
-
-@Client.on_message(filters.command("cstop"))
-async def channel_stop(client: Client, message: Message):
-    bot = get_bot_instance(client)
-    if not bot or not await bot.auth_manager.is_admin(message):
-        await message.reply_text("❌ This command requires admin privileges!")
-        return
-    
-    group_id = message.chat.id
-    
-    if group_id not in channel_connections:
-        await message.reply_text("❌ No channel connected!")
-        return
-    
-    channel_id = channel_connections[group_id]
-    
-    success = await bot.music_player.stop(channel_id)
-    
-    if success:
-        try:
-            channel = await client.get_chat(channel_id)
-            channel_name = channel.title
-        except:
-            channel_name = "Connected Channel"
-        
-        await message.reply_text(f"⏹ **Stopped playback in {channel_name}**")
-    else:
-        await message.reply_text("❌ Failed to stop channel playback!")
-
-@Client.on_message(filters.command("disconnect"))
-async def disconnect_channel(client: Client, message: Message):
-    bot = get_bot_instance(client)
-    if not bot or not await bot.auth_manager.is_admin(message):
-        await message.reply_text("❌ This command requires admin privileges!")
-        return
-    
-    group_id = message.chat.id
-    
-    if group_id not in channel_connections:
-        await message.reply_text("❌ No channel connected to this group!")
-        return
-    
-    channel_id = channel_connections[group_id]
-    
-    try:
-        # Stop playback if active
-        await bot.music_player.stop(channel_id)
-        
-        # Get channel name
-        try:
-            channel = await client.get_chat(channel_id)
-            channel_name = channel.title
-        except:
-            channel_name = "Channel"
-        
-        # Disconnect
-        del channel_connections[group_id]
-        
-        await message.reply_text(
-            f"🔌 **Channel Disconnected**\n\n"
-            f"**{channel_name}** has been disconnected from this group.\n"
-            f"Use `/channelplay` to connect a channel again."
-        )
-        
-        logger.info(f"Channel {channel_id} disconnected from group {group_id}")
-        
-    except Exception as e:
-        logger.error(f"Channel disconnect error: {e}")
-        await message.reply_text("❌ Failed to disconnect channel!")
-
-@Client.on_message(filters.command("connected"))
-async def show_connected_channel(client: Client, message: Message):
-    group_id = message.chat.id
-    
-    if group_id not in channel_connections:
-        await message.reply_text("❌ No channel connected to this group!")
-        return
-    
-    channel_id = channel_connections[group_id]
-    
-    try:
-        channel = await
+        await message.reply_text("❌ Failed to get channel info!")
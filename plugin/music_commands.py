@@ -83,6 +83,15 @@ async def play_song(client: Client, message: Message):
     query = " ".join(message.command[1:])
     chat_id = message.chat.id
     
+    if bot.music_player.get_current_playing(chat_id) and bot.music_player.is_queue_full(chat_id):
+        await message.reply_text(f"❌ Queue is full! (limit: {Config.QUEUE_LIMIT} songs)")
+        return
+    
+    # Playlists start the first track and queue the rest unresolved
+    if bot.youtube_dl.is_playlist_url(query):
+        await play_playlist(bot, message, query, is_video)
+        return
+    
     # Search and play
     search_msg = await message.reply_text("🔍 **Searching...**")
     
@@ -110,6 +119,7 @@ async def play_song(client: Client, message: Message):
             duration=result['duration'],
             requester=message.from_user.mention,
             stream_url=stream_url,
+            url=result['url'],
             is_video=is_video
         )
         
@@ -132,7 +142,7 @@ async def play_song(client: Client, message: Message):
                 )
             else:
                 # Added to queue
-                queue_pos = len(await bot.music_player.get_queue(chat_id))
+                queue_pos = bot.music_player.get_queue_length(chat_id)
                 await search_msg.edit_text(
                     f"📝 **Added to Queue (#**{queue_pos}**)**\n\n"
                     f"**Title:** {result['title']}\n"
@@ -146,6 +156,59 @@ async def play_song(client: Client, message: Message):
         logger.error(f"Play error: {e}")
         await search_msg.edit_text("❌ An error occurred while playing!")
 
+async def play_playlist(bot, message: Message, url: str, is_video: bool):
+    """Play first playlist entry right away and lazily queue the rest"""
+    chat_id = message.chat.id
+    search_msg = await message.reply_text("📜 **Loading playlist...**")
+    
+    try:
+        entries = await bot.youtube_dl.get_playlist_entries(url)
+        
+        if not entries:
+            await search_msg.edit_text("❌ No songs found in playlist!")
+            return
+        
+        requester = message.from_user.mention
+        items = [
+            QueueItem(
+                title=entry['title'],
+                duration=entry['duration'],
+                requester=requester,
+                is_video=is_video,
+                url=entry['url']
+            )
+            for entry in entries
+        ]
+        
+        # Only the first item is resolved now, the rest right before they play
+        first = items[0]
+        success = await bot.music_player.play(chat_id, first)
+        if not success:
+            await search_msg.edit_text("❌ Failed to start playback!")
+            return
+        
+        queued = await bot.music_player.add_many_to_queue(chat_id, items[1:])
+        
+        current_info = bot.music_player.get_current_playing(chat_id)
+        status = "🎵 **Now Playing:**" if current_info is first else "📝 **Added to Queue:**"
+        skipped = len(items) - 1 - queued
+        
+        text = f"📜 **Playlist Loaded** ({len(items) - skipped} songs)\n\n"
+        if skipped:
+            text += f"⚠️ **{skipped} songs skipped, queue is full!**\n\n"
+        text += (
+            f"{status}\n"
+            f"**Title:** {first.title}\n"
+            f"**Duration:** {first.duration}\n"
+            f"**Requested by:** {requester}"
+        )
+        
+        await search_msg.edit_text(text, reply_markup=get_player_keyboard(chat_id))
+        
+    except Exception as e:
+        logger.error(f"Playlist play error: {e}")
+        await search_msg.edit_text("❌ An error occurred while loading the playlist!")
+
 @Client.on_message(filters.command(["playforce", "vplayforce"]))
 async def force_play(client: Client, message: Message):
     bot = get_bot_instance(client)
@@ -188,6 +251,7 @@ async def force_play(client: Client, message: Message):
             duration=result['duration'],
             requester=message.from_user.mention,
             stream_url=stream_url,
+            url=result['url'],
             is_video=is_video
         )
         
@@ -326,21 +390,108 @@ async def toggle_loop(client: Client, message: Message):
     if len(message.command) > 1:
         try:
             count = int(message.command[1])
-            await bot.music_player.set_loop(chat_id, 1, count)
-            await message.reply_text(f"🔁 **Loop enabled for {count} times**")
+            if await bot.music_player.set_loop(chat_id, 1, count):
+                await message.reply_text(f"🔁 **Loop enabled for {count} times**")
+            else:
+                await message.reply_text("❌ Nothing is playing!")
         except ValueError:
             await message.reply_text("❌ Invalid loop count!")
     else:
         # Toggle loop mode
-        current_mode = bot.music_player.loop_mode.get(chat_id, 0)
+        current_mode = bot.music_player.get_loop_mode(chat_id)
         new_mode = 0 if current_mode > 0 else 2
-        await bot.music_player.set_loop(chat_id, new_mode)
-        
-        if new_mode == 0:
+        if not await bot.music_player.set_loop(chat_id, new_mode):
+            await message.reply_text("❌ Nothing is playing!")
+        elif new_mode == 0:
             await message.reply_text("🔁 **Loop Disabled**")
         else:
             await message.reply_text("🔁 **Queue Loop Enabled**")
 
+def parse_queue_index(value: str, queue_length: int) -> int:
+    """Turn a 1-based position from /queue into a queue index, -1 if invalid"""
+    try:
+        index = int(value) - 1
+    except ValueError:
+        return -1
+    return index if 0 <= index < queue_length else -1
+
+@Client.on_message(filters.command("remove"))
+async def remove_song(client: Client, message: Message):
+    bot = get_bot_instance(client)
+    if not bot or not await bot.auth_manager.is_authorized(message):
+        return
+    
+    if len(message.command) < 2:
+        await message.reply_text("❌ Please specify a queue position!\n\n**Usage:** `/remove <position>`")
+        return
+    
+    chat_id = message.chat.id
+    queue_length = bot.music_player.get_queue_length(chat_id)
+    index = parse_queue_index(message.command[1], queue_length)
+    
+    if index < 0:
+        await message.reply_text(f"❌ Invalid position! Queue has {queue_length} songs.")
+        return
+    
+    item = await bot.music_player.remove_from_queue(chat_id, index)
+    if item:
+        await message.reply_text(f"🗑 **Removed #{index + 1}:** {item.title}")
+    else:
+        await message.reply_text("❌ Failed to remove song!")
+
+@Client.on_message(filters.command("move"))
+async def move_song(client: Client, message: Message):
+    bot = get_bot_instance(client)
+    if not bot or not await bot.auth_manager.is_authorized(message):
+        return
+    
+    if len(message.command) < 3:
+        await message.reply_text(
+            "❌ Please specify both positions!\n\n"
+            "**Usage:** `/move <from> <to>`\n"
+            "**Example:** `/move 5 1` - Make song #5 play next"
+        )
+        return
+    
+    chat_id = message.chat.id
+    queue_length = bot.music_player.get_queue_length(chat_id)
+    src = parse_queue_index(message.command[1], queue_length)
+    dst = parse_queue_index(message.command[2], queue_length)
+    
+    if src < 0 or dst < 0:
+        await message.reply_text(f"❌ Invalid position! Queue has {queue_length} songs.")
+        return
+    
+    item = await bot.music_player.move_in_queue(chat_id, src, dst)
+    if item:
+        await message.reply_text(f"↕️ **Moved to #{dst + 1}:** {item.title}")
+    else:
+        await message.reply_text("❌ Failed to move song!")
+
+@Client.on_message(filters.command("skipto"))
+async def skip_to_song(client: Client, message: Message):
+    bot = get_bot_instance(client)
+    if not bot or not await bot.auth_manager.is_authorized(message):
+        return
+    
+    if len(message.command) < 2:
+        await message.reply_text("❌ Please specify a queue position!\n\n**Usage:** `/skipto <position>`")
+        return
+    
+    chat_id = message.chat.id
+    queue_length = bot.music_player.get_queue_length(chat_id)
+    index = parse_queue_index(message.command[1], queue_length)
+    
+    if index < 0:
+        await message.reply_text(f"❌ Invalid position! Queue has {queue_length} songs.")
+        return
+    
+    item = await bot.music_player.skip_to(chat_id, index)
+    if item:
+        await message.reply_text(f"⏭ **Skipped to #{index + 1}:** {item.title}", reply_markup=get_player_keyboard(chat_id))
+    else:
+        await message.reply_text("❌ Failed to skip to that song!")
+
 def get_player_keyboard(chat_id: int):
     """Get player control keyboard"""
     return InlineKeyboardMarkup([
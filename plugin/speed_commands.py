@@ -1,5 +1,6 @@
 from pyrogram import Client, filters
 from pyrogram.types import Message
+from .channel_commands import channel_connections
 import logging
 
 logger = logging.getLogger(__name__)
@@ -7,25 +8,19 @@ logger = logging.getLogger(__name__)
 def get_bot_instance(client):
     return getattr(client, 'bot_instance', None)
 
-@Client.on_message(filters.command(["speed", "playback"]))
-async def set_playback_speed(client: Client, message: Message):
-    bot = get_bot_instance(client)
-    if not bot or not await bot.auth_manager.is_authorized(message):
-        return
-    
-    if message.chat.type.name == "PRIVATE":
-        await message.reply_text("❌ This command only works in groups!")
-        return
+async def change_speed(bot, message: Message, chat_id: int):
+    """Parse /speed or /cspeed arguments and apply the speed to chat_id"""
+    command = message.command[0]
     
     if len(message.command) < 2:
         await message.reply_text(
             "❌ Please specify speed!\n\n"
-            "**Usage:** `/speed <0.5-3.0>`\n"
+            f"**Usage:** `/{command} <0.5-3.0>`\n"
             "**Examples:**\n"
-            "• `/speed 0.5` - Half speed\n"
-            "• `/speed 1.0` - Normal speed\n"
-            "• `/speed 1.5` - 1.5x speed\n"
-            "• `/speed 2.0` - Double speed"
+            f"• `/{command} 0.5` - Half speed\n"
+            f"• `/{command} 1.0` - Normal speed\n"
+            f"• `/{command} 1.5` - 1.5x speed\n"
+            f"• `/{command} 2.0` - Double speed"
         )
         return
     
@@ -36,7 +31,6 @@ async def set_playback_speed(client: Client, message: Message):
             await message.reply_text("❌ Speed must be between 0.5 and 3.0!")
             return
         
-        chat_id = message.chat.id
         current = bot.music_player.get_current_playing(chat_id)
         
         if not current:
@@ -69,6 +63,18 @@ async def set_playback_speed(client: Client, message: Message):
         logger.error(f"Speed change error: {e}")
         await message.reply_text("❌ An error occurred!")
 
+@Client.on_message(filters.command(["speed", "playback"]))
+async def set_playback_speed(client: Client, message: Message):
+    bot = get_bot_instance(client)
+    if not bot or not await bot.auth_manager.is_authorized(message):
+        return
+    
+    if message.chat.type.name == "PRIVATE":
+        await message.reply_text("❌ This command only works in groups!")
+        return
+    
+    await change_speed(bot, message, message.chat.id)
+
 @Client.on_message(filters.command(["cspeed", "cplayback"]))
 async def set_channel_speed(client: Client, message: Message):
     bot = get_bot_instance(client)
@@ -76,8 +82,16 @@ async def set_channel_speed(client: Client, message: Message):
         await message.reply_text("❌ This command requires admin privileges!")
         return
     
-    # Similar to set_playback_speed but for connected channels
-    await message.reply_text("🔧 Channel speed control - Coming soon!")
+    group_id = message.chat.id
+    
+    if group_id not in channel_connections:
+        await message.reply_text(
+            "❌ No channel connected to this group!\n\n"
+            "Use `/channelplay <@channel>` to connect a channel first."
+        )
+        return
+    
+    await change_speed(bot, message, channel_connections[group_id])
 
 @Client.on_message(filters.command("seek"))
 async def seek_position(client: Client, message: Message):
@@ -168,7 +182,7 @@ async def seek_backward(client: Client, message: Message):
             return
         
         # Calculate new position
-        current_position = getattr(current, 'position', 0)
+        current_position = bot.music_player.get_position(chat_id)
         new_position = max(0, current_position - seconds)
         
         success = await bot.music_player.seek(chat_id, new_position)
@@ -0,0 +1,164 @@
+import asyncio
+import json
+import time
+from typing import Dict, List, Optional
+from config import Config
+import logging
+
+logger = logging.getLogger(__name__)
+
+class QueueJournal:
+    """Write-ahead journal of queue mutations, flushed to SQLite in batches"""
+
+    HEARTBEAT_INTERVAL = 15  # seconds between heartbeats while nothing changes
+
+    def __init__(self, db, flush_interval: float = None, compact_interval: int = None):
+        self.db = db
+        self.flush_interval = flush_interval or Config.JOURNAL_FLUSH_INTERVAL
+        self.compact_interval = compact_interval or Config.JOURNAL_COMPACT_INTERVAL
+        self.buffer: List[tuple] = []
+        self.task: Optional[asyncio.Task] = None
+        self.heartbeat_at = 0.0
+        self.compacted_at = time.monotonic()
+        self.flushed = 0
+
+    def record(self, chat_id: int, op: str, **data):
+        """Queue a mutation for the next flush; never waits on the database"""
+        self.buffer.append((chat_id, op, json.dumps(data), time.time()))
+
+    def start(self):
+        if not self.task:
+            self.task = asyncio.create_task(self.run())
+
+    async def close(self):
+        """Stop the flush loop and write out what is still buffered"""
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        await self.flush()
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+                if time.monotonic() - self.compacted_at >= self.compact_interval:
+                    await self.compact()
+            except Exception as e:
+                logger.error(f"Queue journal error: {e}")
+
+    async def flush(self):
+        """Write buffered mutations in one transaction"""
+        now = time.time()
+        if not self.buffer and now - self.heartbeat_at < self.HEARTBEAT_INTERVAL:
+            return
+
+        batch, self.buffer = self.buffer, []
+        if await self.db.append_journal(batch, now):
+            self.heartbeat_at = now
+            self.flushed += len(batch)
+        else:
+            # Keep the batch for the next attempt, ahead of anything recorded meanwhile
+            self.buffer[:0] = batch
+
+    async def compact(self):
+        """Fold journal rows into per-chat snapshots and truncate the journal"""
+        self.compacted_at = time.monotonic()
+        snapshots, rows = await self.db.load_journal()
+        if not rows:
+            return
+
+        states, touched = self.replay(snapshots, rows)
+        upto_seq = rows[-1][0]
+        await self.db.compact_journal(
+            [(chat_id, json.dumps(states[chat_id]) if chat_id in states else None, upto_seq)
+             for chat_id in touched],
+            upto_seq
+        )
+        logger.info(f"Compacted {len(rows)} queue journal rows into {len(touched)} snapshots")
+
+    async def load(self) -> Dict[int, dict]:
+        """Rebuild the last known state of every chat, with positions advanced to the last heartbeat"""
+        snapshots, rows = await self.db.load_journal()
+        states, _ = self.replay(snapshots, rows)
+
+        heartbeat = await self.db.get_stat("journal_heartbeat")
+        for state in states.values():
+            if state["current"] and not state["paused"] and heartbeat > state["at"]:
+                state["position"] += (heartbeat - state["at"]) * state["speed"]
+        return states
+
+    @classmethod
+    def replay(cls, snapshots: Dict[int, tuple], rows: List[tuple]):
+        """Apply journal rows on top of snapshots, returns states and the chats rows touched"""
+        states = {chat_id: json.loads(state) for chat_id, (state, _) in snapshots.items()}
+        snapshot_seqs = {chat_id: seq for chat_id, (_, seq) in snapshots.items()}
+        touched = set()
+
+        for seq, chat_id, op, data in rows:
+            # Rows already folded into a snapshot survive a compaction interrupted midway
+            if seq <= snapshot_seqs.get(chat_id, 0):
+                continue
+            touched.add(chat_id)
+            if op == "stop":
+                states.pop(chat_id, None)
+                continue
+            state = states.get(chat_id)
+            if state is None:
+                state = states[chat_id] = cls.empty_state()
+            cls.apply(state, op, json.loads(data))
+
+        return states, touched
+
+    @staticmethod
+    def empty_state() -> dict:
+        return {
+            "current": None,
+            "position": 0.0,
+            "at": 0.0,
+            "paused": False,
+            "speed": 1.0,
+            "loop_mode": 0,
+            "loop_count": 0,
+            "queue": []
+        }
+
+    @staticmethod
+    def apply(state: dict, op: str, data: dict):
+        queue = state["queue"]
+        if op == "push":
+            queue.extend(data["items"])
+        elif op == "pop":
+            if queue:
+                queue.pop(0)
+        elif op == "remove":
+            if data["index"] < len(queue):
+                queue.pop(data["index"])
+        elif op == "move":
+            if data["src"] < len(queue):
+                queue.insert(data["dst"], queue.pop(data["src"]))
+        elif op == "jump":
+            del queue[:data["index"] + 1]
+        elif op == "reset":
+            state["queue"] = data["items"]
+        elif op == "clear":
+            queue.clear()
+        elif op == "play":
+            state["current"] = data["item"]
+            state.update(position=data["position"], at=data["at"], paused=False, speed=data["speed"])
+        elif op == "position":
+            state.update(position=data["position"], at=data["at"], paused=data["paused"], speed=data["speed"])
+        elif op == "idle":
+            state["current"] = None
+        elif op == "loop":
+            state.update(loop_mode=data["mode"], loop_count=data["count"])
+
+    def get_stats(self) -> dict:
+        return {
+            "buffered": len(self.buffer),
+            "flushed": self.flushed
+        }
@@ -0,0 +1,99 @@
+import asyncio
+import math
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+class TimerWheel:
+    """Hashed timing wheel that runs every keyed deadline from a single task"""
+
+    def __init__(self, tick: float = 1.0, size: int = 512):
+        self.tick = tick
+        self.size = size
+        self.slots: List[Dict[Hashable, Tuple[int, Callable]]] = [{} for _ in range(size)]
+        self.timers: Dict[Hashable, int] = {}  # key -> slot index
+        self.cursor = 0  # ticks processed so far
+        self.started_at = 0.0
+        self.task: Optional[asyncio.Task] = None
+        self.running = set()  # callback tasks, referenced until they finish
+        self.fired = 0
+
+    def start(self):
+        """Start ticking on the running loop"""
+        if self.task:
+            return
+        self.started_at = asyncio.get_running_loop().time()
+        self.task = asyncio.create_task(self.run())
+
+    def stop(self):
+        """Stop ticking and drop every pending deadline"""
+        if self.task:
+            self.task.cancel()
+            self.task = None
+        for slot in self.slots:
+            slot.clear()
+        self.timers.clear()
+
+    def schedule(self, key: Hashable, delay: float, callback: Callable):
+        """Run callback after delay seconds, replacing any deadline under the same key"""
+        self.cancel(key)
+        target = self.cursor + max(1, math.ceil(delay / self.tick))
+        index = target % self.size
+        self.slots[index][key] = (target, callback)
+        self.timers[key] = index
+
+    def cancel(self, key: Hashable) -> bool:
+        """Drop the deadline under key, returns whether one was pending"""
+        index = self.timers.pop(key, None)
+        if index is None:
+            return False
+        del self.slots[index][key]
+        return True
+
+    def pending(self, key: Hashable) -> bool:
+        return key in self.timers
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.started_at + (self.cursor + 1) * self.tick - loop.time())
+
+            # A stalled loop catches up on every tick it missed
+            elapsed = int((loop.time() - self.started_at) / self.tick)
+            while self.cursor < elapsed:
+                self.cursor += 1
+                self.advance()
+
+    def advance(self):
+        """Fire deadlines that are due in the current slot"""
+        slot = self.slots[self.cursor % self.size]
+        due = [key for key, (target, _) in slot.items() if target <= self.cursor]
+
+        for key in due:
+            _, callback = slot.pop(key)
+            del self.timers[key]
+            self.fire(key, callback)
+
+    def fire(self, key: Hashable, callback: Callable):
+        self.fired += 1
+        try:
+            result = callback()
+            if asyncio.iscoroutine(result):
+                task = asyncio.create_task(result)
+                self.running.add(task)
+                task.add_done_callback(lambda t: self.finish(key, t))
+        except Exception as e:
+            logger.error(f"Timer {key} failed: {e}")
+
+    def finish(self, key: Hashable, task: asyncio.Task):
+        self.running.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.error(f"Timer {key} failed: {task.exception()}")
+
+    def get_stats(self) -> dict:
+        return {
+            "pending": len(self.timers),
+            "running": len(self.running),
+            "fired": self.fired
+        }
@@ -1,22 +1,210 @@
 import os
 import asyncio
-import yt_dlp
-from typing import Dict, List, Optional, Tuple
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 import re
+import time
 import logging
+import inspect
+import threading
+from collections import OrderedDict
 from config import Config
+from media_cache import MediaCache
+from extractor_backend import ExtractorBackend
 
 logger = logging.getLogger(__name__)
 
+class SearchCache:
+    """TTL + LRU cache of search results keyed by normalized query.
+
+    Each entry remembers how many results were requested, so a smaller
+    limit is served from a larger cached result.
+    """
+
+    def __init__(self, ttl: int = None, max_size: int = None):
+        self.ttl = ttl if ttl is not None else Config.SEARCH_CACHE_TTL
+        self.max_size = max_size if max_size is not None else Config.SEARCH_CACHE_SIZE
+        self.entries: "OrderedDict[str, Tuple[float, int, List[Dict]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        """Fold case, whitespace and punctuation of a search query"""
+        query = query.strip()
+        if re.match(r'^https?://', query):
+            return query
+        folded = re.sub(r'[^\w\s]', ' ', query.casefold())
+        folded = " ".join(folded.split())
+        return folded or " ".join(query.casefold().split())
+
+    def get(self, key: str, limit: int) -> Optional[List[Dict]]:
+        """Get cached results for a normalized query"""
+        entry = self.entries.get(key)
+        if entry:
+            stored_at, fetched, results = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self.entries[key]
+            # A short result list means there is nothing more to fetch
+            elif fetched >= limit or len(results) < fetched:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return results[:limit]
+        self.misses += 1
+        return None
+
+    def put(self, key: str, fetched: int, results: List[Dict]):
+        """Store results for a normalized query"""
+        current = self.entries.get(key)
+        if current and current[1] > fetched and time.monotonic() - current[0] <= self.ttl:
+            return
+        self.entries[key] = (time.monotonic(), fetched, results)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def get_stats(self) -> dict:
+        """Get cache statistics"""
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+class StreamURLCache:
+    """Cache of resolved stream URLs that honours the URL's expire= parameter"""
+
+    def __init__(self, margin: int = None, default_ttl: int = None, max_size: int = None):
+        self.margin = margin if margin is not None else Config.STREAM_URL_EXPIRY_MARGIN
+        self.default_ttl = default_ttl if default_ttl is not None else Config.STREAM_URL_DEFAULT_TTL
+        self.max_size = max_size if max_size is not None else Config.STREAM_URL_CACHE_SIZE
+        self.entries: "OrderedDict[Tuple[str, str], Tuple[str, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def get_expiry(stream_url: str) -> Optional[float]:
+        """Read the expiry timestamp from a googlevideo URL"""
+        match = re.search(r'[?&/]expire[=/](\d+)', stream_url)
+        return float(match.group(1)) if match else None
+
+    def get(self, key: Tuple[str, str]) -> Optional[str]:
+        """Get a stream URL that is still valid for a while"""
+        entry = self.entries.get(key)
+        if entry:
+            stream_url, evict_at = entry
+            if time.time() < evict_at:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return stream_url
+            del self.entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key: Tuple[str, str], stream_url: str):
+        """Store a stream URL until shortly before it expires"""
+        expiry = self.get_expiry(stream_url) or time.time() + self.default_ttl
+        evict_at = expiry - self.margin
+        if evict_at <= time.time():
+            return
+        self.entries[key] = (stream_url, evict_at)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, key: Tuple[str, str]):
+        """Drop a stream URL that failed to play"""
+        self.entries.pop(key, None)
+
+    def get_stats(self) -> dict:
+        """Get cache statistics"""
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+class ProgressBridge:
+    """Thread-safe, rate-limited bridge from yt-dlp progress hooks to the event loop.
+
+    yt-dlp calls hooks synchronously from executor threads. The bridge
+    keeps only the latest event, hands it to the loop with
+    call_soon_threadsafe and calls the (async or sync) callback at most
+    once every `interval` seconds.
+    """
+
+    def __init__(self, callback, interval: float = None, loop: asyncio.AbstractEventLoop = None):
+        self.callback = callback
+        self.interval = interval if interval is not None else Config.PROGRESS_UPDATE_INTERVAL
+        self.loop = loop or asyncio.get_event_loop()
+        self.lock = threading.Lock()
+        self.latest = None
+        self.scheduled = False
+        self.closed = False
+        self.last_sent = 0.0
+        self.task = None
+
+    def __call__(self, d):
+        """Progress hook, may be called from any thread"""
+        with self.lock:
+            if self.closed:
+                return
+            self.latest = d
+            if self.scheduled:
+                return
+            self.scheduled = True
+        self.loop.call_soon_threadsafe(self._schedule)
+
+    def _schedule(self):
+        if not self.closed:
+            self.task = self.loop.create_task(self._deliver())
+
+    async def _deliver(self):
+        delay = self.last_sent + self.interval - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        
+        with self.lock:
+            d, self.latest = self.latest, None
+            self.scheduled = False
+        if d is None or self.closed:
+            return
+        
+        self.last_sent = time.monotonic()
+        try:
+            result = self.callback(d)
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            logger.error(f"Progress callback error: {e}")
+
+    def close(self):
+        """Stop delivering events, dropping any pending update"""
+        with self.lock:
+            self.closed = True
+            self.latest = None
+        if self.task and not self.task.done():
+            self.task.cancel()
+
 class YouTubeDownloader:
     def __init__(self):
-        self.downloading = {}
+        self.downloading: Dict[str, asyncio.Future] = {}
+        self.download_waiters: Dict[str, int] = {}
+        self.download_hooks: Dict[str, List] = {}
         self.download_semaphore = asyncio.Semaphore(Config.MAX_CONCURRENT_DOWNLOADS)
+        self.cache = MediaCache()
+        self.search_cache = SearchCache()
+        self.searching: Dict[str, Tuple[int, asyncio.Future]] = {}
+        self.stream_url_cache = StreamURLCache()
+        self.backend = ExtractorBackend()
+    
+    async def initialize(self):
+        """Start the extraction backend"""
+        await self.backend.start()
         
     def get_ydl_opts(self, format_type: str = "audio", quality: str = "best"):
         """Get yt-dlp options"""
         base_opts = {
-            'outtmpl': f'{Config.DOWNLOAD_DIR}/%(title)s.%(ext)s',
+            'outtmpl': f'{Config.DOWNLOAD_DIR}/%(id)s_{format_type}_{quality}.%(ext)s',
             'writeinfojson': False,
             'writedescription': False,
             'writesubtitles': False,
@@ -57,26 +245,51 @@ class YouTubeDownloader:
         return "best"
     
     async def search_youtube(self, query: str, limit: int = 10) -> List[Dict]:
-        """Search YouTube for videos"""
+        """Search YouTube for videos, serving repeated queries from the search cache"""
+        key = self.search_cache.normalize(query)
+        cached = self.search_cache.get(key, limit)
+        if cached is not None:
+            return cached
+        
+        # Small lookups fetch a full page so later /song searches hit the cache
+        fetch = max(limit, 10)
+        
+        # Identical queries already in flight share one extraction
+        pending = self.searching.get(key)
+        if pending and pending[0] >= fetch:
+            job = pending[1]
+        else:
+            job = asyncio.ensure_future(self._search(query, key, fetch))
+            self.searching[key] = (fetch, job)
+            job.add_done_callback(lambda done: self._release_search(key, done))
+        
+        results = await asyncio.shield(job)
+        return results[:limit]
+    
+    def _release_search(self, key: str, job: asyncio.Future):
+        """Forget a finished search job"""
+        pending = self.searching.get(key)
+        if pending and pending[1] is job:
+            self.searching.pop(key, None)
+    
+    async def _search(self, query: str, key: str, fetch: int) -> List[Dict]:
+        """Run a YouTube search and cache successful results"""
         try:
             ydl_opts = {
                 'quiet': True,
                 'no_warnings': True,
                 'extract_flat': True,
-                'default_search': 'ytsearch10:',
+                'default_search': 'ytsearch',
             }
             
-            loop = asyncio.get_event_loop()
+            # The result count goes in the query so one pooled profile serves every limit
+            search_query = query if re.match(r'^https?://', query.strip()) else f"ytsearch{fetch}:{query}"
             
-            def search():
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    return ydl.extract_info(query, download=False)
-            
-            info = await loop.run_in_executor(None, search)
+            info = await self.backend.extract("search", ydl_opts, search_query)
             
             results = []
             if 'entries' in info:
-                for entry in info['entries'][:limit]:
+                for entry in info['entries'][:fetch]:
                     if entry:
                         results.append({
                             'id': entry.get('id'),
@@ -87,6 +300,8 @@ class YouTubeDownloader:
                             'uploader': entry.get('uploader', 'Unknown')
                         })
             
+            if results:
+                self.search_cache.put(key, fetch, results)
             return results
             
         except Exception as e:
@@ -101,13 +316,7 @@ class YouTubeDownloader:
                 'no_warnings': True,
             }
             
-            loop = asyncio.get_event_loop()
-            
-            def get_info():
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    return ydl.extract_info(url, download=False)
-            
-            info = await loop.run_in_executor(None, get_info)
+            info = await self.backend.extract("info", ydl_opts, url)
             
             if not info:
                 return None
@@ -131,33 +340,85 @@ class YouTubeDownloader:
     
     async def download(self, url: str, format_type: str = "audio", quality: str = "best", 
                       progress_callback=None) -> Optional[Tuple[str, Dict]]:
-        """Download video/audio"""
+        """Download video/audio, serving repeat requests from the media cache.
+
+        Concurrent calls for the same (video_id, format, quality) share one
+        in-flight download, which is cancelled only once every caller has
+        gone away.
+        """
+        video_id = self.extract_video_id(url)
+        if not video_id:
+            return None
+        
+        cache_key = self.cache.make_key(video_id, format_type, quality)
+        cached = self.cache.get(cache_key)
+        if cached:
+            return cached
+        
+        job = self.downloading.get(cache_key)
+        if not job:
+            self.download_hooks[cache_key] = []
+            self.download_waiters[cache_key] = 0
+            job = asyncio.ensure_future(
+                self._download_job(url, video_id, format_type, quality, cache_key)
+            )
+            self.downloading[cache_key] = job
+            job.add_done_callback(lambda done: self._release_download(cache_key, done))
+        
+        hooks = self.download_hooks[cache_key]
+        if progress_callback:
+            hooks.append(progress_callback)
+        self.download_waiters[cache_key] += 1
+        
+        try:
+            return await asyncio.shield(job)
+        finally:
+            if progress_callback and progress_callback in hooks:
+                hooks.remove(progress_callback)
+            if self.downloading.get(cache_key) is job:
+                self.download_waiters[cache_key] -= 1
+                if self.download_waiters[cache_key] <= 0 and not job.done():
+                    job.cancel()
+    
+    def _release_download(self, cache_key: str, job: asyncio.Future):
+        """Forget a finished download job"""
+        if self.downloading.get(cache_key) is job:
+            self.downloading.pop(cache_key, None)
+            self.download_hooks.pop(cache_key, None)
+            self.download_waiters.pop(cache_key, None)
+        if not job.cancelled() and job.exception():
+            logger.error(f"Download job error for {cache_key}: {job.exception()}")
+    
+    async def _download_job(self, url: str, video_id: str, format_type: str, quality: str,
+                            cache_key: str) -> Optional[Tuple[str, Dict]]:
+        """Run a single yt-dlp download and store the result in the media cache"""
         async with self.download_semaphore:
             try:
-                video_id = self.extract_video_id(url)
-                if not video_id:
-                    return None
-                
-                # Check if already downloading
-                if video_id in self.downloading:
-                    return None
-                
-                self.downloading[video_id] = True
+                # Another job may have filled the cache while this one was queued
+                cached = self.cache.get(cache_key)
+                if cached:
+                    return cached
                 
                 ydl_opts = self.get_ydl_opts(format_type, quality)
                 
-                # Add progress hook
-                if progress_callback:
-                    ydl_opts['progress_hooks'] = [progress_callback]
+                # Fan progress out to every caller waiting on this download
+                hooks = self.download_hooks.get(cache_key, [])
                 
-                loop = asyncio.get_event_loop()
+                def progress_hook(d):
+                    for hook in list(hooks):
+                        try:
+                            hook(d)
+                        except Exception as e:
+                            logger.error(f"Progress hook error: {e}")
                 
-                def download_func():
-                    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                        info = ydl.extract_info(url, download=True)
-                        return info
-                
-                info = await loop.run_in_executor(None, download_func)
+                info = await self.backend.extract(
+                    ("download", format_type, quality),
+                    ydl_opts,
+                    url,
+                    download=True,
+                    progress_hook=progress_hook,
+                    timeout=0
+                )
                 
                 if not info:
                     return None
@@ -165,16 +426,19 @@ class YouTubeDownloader:
                 # Find downloaded file
                 title = info.get('title', 'Unknown')
                 ext = 'mp3' if format_type == "audio" else info.get('ext', 'mp4')
-                file_path = os.path.join(Config.DOWNLOAD_DIR, f"{title}.{ext}")
+                file_prefix = f"{info.get('id', video_id)}_{format_type}_{quality}"
+                file_path = os.path.join(Config.DOWNLOAD_DIR, f"{file_prefix}.{ext}")
                 
-                # Handle filename conflicts
+                # Postprocessors may change the extension
                 if not os.path.exists(file_path):
-                    # Try to find the actual file
                     for file in os.listdir(Config.DOWNLOAD_DIR):
-                        if video_id in file or title[:50] in file:
+                        if file.startswith(file_prefix) and not file.endswith(".part"):
                             file_path = os.path.join(Config.DOWNLOAD_DIR, file)
                             break
                 
+                if not os.path.exists(file_path):
+                    return None
+                
                 video_info = {
                     'id': info.get('id'),
                     'title': title,
@@ -182,20 +446,20 @@ class YouTubeDownloader:
                     'thumbnail': info.get('thumbnail'),
                     'uploader': info.get('uploader', 'Unknown'),
                     'url': info.get('webpage_url', url),
-                    'file_size': os.path.getsize(file_path) if os.path.exists(file_path) else 0
+                    'file_size': os.path.getsize(file_path)
                 }
                 
+                file_path = self.cache.put(cache_key, file_path, video_info)
                 return file_path, video_info
                 
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
                 logger.error(f"Download error for {url}: {e}")
                 return None
-            finally:
-                self.downloading.pop(video_id, None)
     
-    async def download_playlist(self, url: str, format_type: str = "audio", 
-                               limit: int = None) -> List[Tuple[str, Dict]]:
-        """Download playlist"""
+    async def get_playlist_entries(self, url: str, limit: int = None) -> List[Dict]:
+        """Flat-extract playlist entries without resolving each video"""
         try:
             ydl_opts = {
                 'quiet': True,
@@ -203,31 +467,76 @@ class YouTubeDownloader:
                 'playlistend': limit or Config.MAX_PLAYLIST_SIZE
             }
             
-            loop = asyncio.get_event_loop()
-            
-            def get_playlist():
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    return ydl.extract_info(url, download=False)
-            
-            playlist_info = await loop.run_in_executor(None, get_playlist)
+            playlist_info = await self.backend.extract(("playlist", ydl_opts['playlistend']), ydl_opts, url)
             
             if not playlist_info or 'entries' not in playlist_info:
                 return []
             
-            results = []
+            entries = []
             for entry in playlist_info['entries']:
                 if entry and entry.get('id'):
-                    video_url = f"https://youtube.com/watch?v={entry['id']}"
-                    result = await self.download(video_url, format_type)
-                    if result:
-                        results.append(result)
+                    entries.append({
+                        'id': entry['id'],
+                        'title': entry.get('title', 'Unknown'),
+                        'url': f"https://youtube.com/watch?v={entry['id']}",
+                        'duration': self.format_duration(entry.get('duration') or 0),
+                        'uploader': entry.get('uploader', 'Unknown')
+                    })
             
-            return results
+            return entries
             
         except Exception as e:
-            logger.error(f"Playlist download error: {e}")
+            logger.error(f"Playlist extraction error: {e}")
             return []
     
+    async def download_playlist(self, url: str, format_type: str = "audio", limit: int = None,
+                                ordered: bool = False, concurrency: int = None
+                                ) -> AsyncIterator[Tuple[Optional[str], Dict]]:
+        """Download playlist entries concurrently, yielding each as it is ready.
+
+        Yields (file_path, info) per entry; failed entries yield
+        (None, info) with an 'error' key. info['index'] is the entry's
+        playlist position, and ordered=True yields in playlist order.
+        """
+        entries = await self.get_playlist_entries(url, limit)
+        if not entries:
+            return
+        
+        semaphore = asyncio.Semaphore(concurrency or Config.PLAYLIST_CONCURRENCY)
+        
+        async def fetch(index: int, entry: Dict) -> Tuple[Optional[str], Dict]:
+            error = "Download failed"
+            async with semaphore:
+                try:
+                    result = await self.download(entry['url'], format_type)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    result = None
+                    error = str(e)
+            
+            if result:
+                file_path, info = result
+                return file_path, dict(info, index=index)
+            return None, dict(entry, index=index, error=error)
+        
+        tasks = [asyncio.ensure_future(fetch(i, entry)) for i, entry in enumerate(entries)]
+        try:
+            if ordered:
+                for task in tasks:
+                    yield await task
+            else:
+                for next_done in asyncio.as_completed(tasks):
+                    yield await next_done
+        finally:
+            # Stop remaining downloads if the caller stops iterating
+            for task in tasks:
+                task.cancel()
+    
+    def is_playlist_url(self, url: str) -> bool:
+        """Check if a query is a YouTube playlist URL"""
+        return bool(re.match(r'^https?://(www\.|m\.|music\.)?youtu(be\.com|\.be)/.*[?&]list=', url.strip()))
+    
     def extract_video_id(self, url: str) -> Optional[str]:
         """Extract video ID from YouTube URL"""
         patterns = [
@@ -241,7 +550,7 @@ class YouTubeDownloader:
                 return match.group(1)
         
         # If it's already a video ID
-        if re.match(r'^[a-zA-Z0-9_-]{11}, url):
+        if re.match(r'^[a-zA-Z0-9_-]{11}$', url):
             return url
         
         return None
@@ -260,23 +569,48 @@ class YouTubeDownloader:
         else:
             return f"{minutes:02d}:{seconds:02d}"
     
-    async def get_stream_url(self, url: str, format_type: str = "audio") -> Optional[str]:
-        """Get direct stream URL without downloading"""
+    def get_stream_cache_key(self, url: str, format_type: str = "audio") -> Tuple[str, str]:
+        """Build stream URL cache key"""
+        return (self.extract_video_id(url) or url, self.get_format_selector(format_type, "best"))
+    
+    def seed_stream_url(self, url: str, stream_url: str, format_type: str = "audio") -> bool:
+        """Reuse a stream URL resolved before a restart while its expire= is still past the margin"""
+        # Without an expiry there is no telling how old the URL is
+        if not StreamURLCache.get_expiry(stream_url):
+            return False
+        cache_key = self.get_stream_cache_key(url, format_type)
+        self.stream_url_cache.put(cache_key, stream_url)
+        return cache_key in self.stream_url_cache.entries
+    
+    def invalidate_stream_url(self, url: str, format_type: str = "audio"):
+        """Forget a cached stream URL, e.g. after it failed to play"""
+        self.stream_url_cache.invalidate(self.get_stream_cache_key(url, format_type))
+    
+    async def get_stream_url(self, url: str, format_type: str = "audio", refresh: bool = False) -> Optional[str]:
+        """Get direct stream URL without downloading.
+
+        Resolved URLs are cached until shortly before they expire; pass
+        refresh=True to force a fresh extraction.
+        """
+        cache_key = self.get_stream_cache_key(url, format_type)
+        if refresh:
+            self.stream_url_cache.invalidate(cache_key)
+        else:
+            cached = self.stream_url_cache.get(cache_key)
+            if cached:
+                return cached
+        
         try:
             ydl_opts = {
                 'quiet': True,
                 'no_warnings': True,
-                'format': self.get_format_selector(format_type, "best")
+                'format': cache_key[1]
             }
             
-            loop = asyncio.get_event_loop()
-            
-            def get_url():
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    info = ydl.extract_info(url, download=False)
-                    return info.get('url') if info else None
-            
-            stream_url = await loop.run_in_executor(None, get_url)
+            info = await self.backend.extract(("stream", cache_key[1]), ydl_opts, url)
+            stream_url = info.get('url') if info else None
+            if stream_url:
+                self.stream_url_cache.put(cache_key, stream_url)
             return stream_url
             
         except Exception as e:
@@ -284,11 +618,24 @@ class YouTubeDownloader:
             return None
     
     def cleanup_downloads(self, max_age_hours: int = 24):
-        """Clean up old downloaded files"""
+        """Trim the media cache to its budget and remove stale uncached files"""
+        self.trim_cache()
+        self.sweep_downloads(max_age_hours)
+    
+    def trim_cache(self):
+        """Evict media cache entries over budget; the cache is only touched from the event loop"""
+        try:
+            self.cache.trim()
+            self.cache.save()
+        except Exception as e:
+            logger.error(f"Cache trim error: {e}")
+    
+    def sweep_downloads(self, max_age_hours: int = 24):
+        """Remove stale files outside the media cache, safe to run in a worker thread"""
         try:
-            import time
             current_time = time.time()
             
+            # Cached files live in a subdirectory, so only leftovers are checked here
             for filename in os.listdir(Config.DOWNLOAD_DIR):
                 filepath = os.path.join(Config.DOWNLOAD_DIR, filename)
                 if os.path.isfile(filepath):
@@ -300,6 +647,11 @@ class YouTubeDownloader:
         except Exception as e:
             logger.error(f"Cleanup error: {e}")
     
+    def close(self):
+        """Shut down the extraction backend and persist the media cache"""
+        self.backend.close()
+        self.cache.save()
+    
     def get_download_progress_text(self, d):
         """Format download progress"""
         if d['status'] == 'downloading':